@@ -0,0 +1,51 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from oeis_html import parse_sequence_links, parse_sequence_links_fast
+
+
+def time_parser(parse, content: str, repeat: int) -> float:
+    """Average seconds per page"""
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        parse("A001000", content)
+    return (time.perf_counter() - start_time) / repeat
+
+
+def time_pool(parse, content: str, pages: int, workers: int) -> float:
+    """Pages per second when parsing is spread over a process pool"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Warm the workers up so process start-up is not measured
+        list(executor.map(parse, ["A001000"] * workers, [content] * workers))
+        start_time = time.perf_counter()
+        list(executor.map(parse, ["A001000"] * pages, [content] * pages, chunksize=4))
+        return pages / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OEIS page parsing on the bundled A001000.html")
+    parser.add_argument("--html", default="A001000.html")
+    parser.add_argument("--repeat", type=int, default=200, help="pages parsed per single-process timing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with open(args.html, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    soup_links = parse_sequence_links("A001000", content)
+    fast_links = parse_sequence_links_fast("A001000", content)
+    print(f"Links found: {len(soup_links)} (outputs identical: {soup_links == fast_links})")
+    print("----------------------------------------")
+
+    soup_time = time_parser(parse_sequence_links, content, args.repeat)
+    fast_time = time_parser(parse_sequence_links_fast, content, args.repeat)
+    print(f"BeautifulSoup:      {soup_time * 1000:.2f} ms/page ({1 / soup_time:.0f} pages/s)")
+    print(f"Streaming parser:   {fast_time * 1000:.2f} ms/page ({1 / fast_time:.0f} pages/s)")
+    print(f"Speedup:            {soup_time / fast_time:.1f}x")
+    print("----------------------------------------")
+
+    for parse, name in ((parse_sequence_links, "BeautifulSoup"), (parse_sequence_links_fast, "Streaming parser")):
+        rate = time_pool(parse, content, args.repeat * args.workers, args.workers)
+        print(f"{name} with {args.workers} processes: {rate:.0f} pages/s")
@@ -0,0 +1 @@
+"""Offline benchmarks of the parsers and Neo4j writers on a seeded synthetic corpus; run `python -m benchmarks --help`"""
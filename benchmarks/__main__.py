@@ -0,0 +1,71 @@
+import os
+import time
+import argparse
+
+from benchmarks.corpus import SCALES, generate_corpus
+from benchmarks.harness import environment, run_isolated, save_results, print_results, compare_results
+from benchmarks.stages import STAGES
+
+# python -m benchmarks --scale 1k
+# python -m benchmarks --scale 100k --stages seq_parse,loader_bulk --tx-latency 0.005
+# python -m benchmarks --compare bench_results/before.json bench_results/after.json
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parsers and Neo4j writers on a synthetic corpus",
+                                     prog="python -m benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k", help="sequences in the corpus")
+    parser.add_argument("--count", type=int, help="exact number of sequences (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default="bench_corpus", help="generated corpora are kept here for reuse")
+    parser.add_argument("--html-pages", type=int, default=2000, help="HTML pages generated and parsed")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages to run")
+    parser.add_argument("--batch-size", type=int, default=5000, help="OEISLoader sequences per flush")
+    parser.add_argument("--writers", type=int, default=4, help="concurrent writers for the parallel stages")
+    parser.add_argument("--merge-limit", type=int, default=10000, help="sequences for the per-MERGE loader stage")
+    parser.add_argument("--tx-latency", type=float, default=0.0, help="simulated seconds per Neo4j transaction")
+    parser.add_argument("--row-latency", type=float, default=0.0, help="simulated seconds per UNWIND row")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="run stages in this process (faster start, peak RSS accumulates across stages)")
+    parser.add_argument("--output", help="results JSON (default bench_results/<corpus>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        raise SystemExit
+
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    count = args.count or SCALES[args.scale]
+    corpus_name = f"{args.count or args.scale}-seed{args.seed}"
+    root = os.path.join(args.corpus_dir, corpus_name)
+    start = time.perf_counter()
+    written = generate_corpus(root, count, args.seed, args.html_pages)
+    print(f"Corpus {root}: wrote {written['seq']} .seq and {written['html']} HTML files "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    options = {
+        "count": count,
+        "seed": args.seed,
+        "batch_size": args.batch_size,
+        "writers": args.writers,
+        "merge_limit": args.merge_limit,
+        "tx_latency": args.tx_latency,
+        "row_latency": args.row_latency,
+    }
+    results = {"corpus": corpus_name, "options": options, "environment": environment(), "stages": {}}
+    for name in stages:
+        print(f"Running {name}...")
+        if args.no_isolate:
+            results["stages"][name] = STAGES[name](root, options)
+        else:
+            results["stages"][name] = run_isolated(STAGES[name], root, options)
+
+    output = args.output or os.path.join("bench_results", f"{corpus_name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    save_results(output, results)
+    print_results(results)
+    print(f"Results saved to {output}")
@@ -0,0 +1,233 @@
+import os
+import html
+import random
+from typing import Dict, Iterator, List
+
+# Seeded synthetic OEIS corpus: .seq files in the internal format (seq/A000/A000001.seq)
+# and OEIS-like HTML pages (html/A000/A000001.html) with the same div structure as oeis.org.
+# Every sequence draws from its own Random(seed, number), so any slice of a corpus can be
+# regenerated on its own and two runs with the same seed produce identical files.
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+KEYWORDS = ["nonn", "easy", "core", "nice", "hard", "more", "mult", "sign", "tabl", "base",
+            "fini", "full", "frac", "cons", "word", "look", "walk", "changed"]
+FIRST_NAMES = ["N. J. A.", "David W.", "Clark", "R. K.", "Michel", "Amiram", "Reinhard", "Robert G.",
+               "Alois P.", "Antti", "Vladeta", "Paul D.", "Eric W.", "Jonathan", "Max", "Peter"]
+LAST_NAMES = ["Sloane", "Wilson", "Kimberling", "Guy", "Marcus", "Eldar", "Zumkeller", "Wilson",
+              "Heinz", "Karttunen", "Jovovic", "Hanna", "Weisstein", "Vos Post", "Alekseyev", "Luschny"]
+WORDS = ["number", "numbers", "partitions", "permutations", "triangle", "primes", "divisors", "sum",
+         "product", "binomial", "coefficients", "expansion", "generating", "function", "recurrence",
+         "integer", "sequence", "Catalan", "Fibonacci", "Lucas", "Motzkin", "Dyck", "paths", "lattice",
+         "graphs", "trees", "labeled", "unlabeled", "compositions", "residues", "modulo", "squarefree",
+         "semiprimes", "continued", "fraction", "digits", "base", "palindromes", "polynomial", "matrix",
+         "determinant", "eigenvalue", "characteristic", "convolution", "Euler", "transform", "Moebius",
+         "inversion", "totient", "sigma", "Stirling", "Bell", "Bernoulli", "involutions", "derangements"]
+BOOKS = ["M. Abramowitz and I. A. Stegun, Handbook of Mathematical Functions",
+         "L. Comtet, Advanced Combinatorics, Reidel, 1974",
+         "R. K. Guy, Unsolved Problems in Number Theory",
+         "G. H. Hardy and E. M. Wright, An Introduction to the Theory of Numbers",
+         "D. E. Knuth, The Art of Computer Programming",
+         "N. J. A. Sloane and Simon Plouffe, The Encyclopedia of Integer Sequences",
+         "R. P. Stanley, Enumerative Combinatorics"]
+FORMULAS = ["a(n-1) + a(n-2)", "Sum_{{k=0..n}} binomial(n,k)*a(k)", "2*a(n-1) - n", "n^2 + {k}",
+            "{k}*a(n-1) - a(n-2)", "(2n)!/(n!(n+1)!)", "a(n-1) + {k}*a(n-2) for n > 1"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+# Popular authors write most entries, as in the real database
+AUTHORS = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+AUTHOR_WEIGHTS = [1 / (rank + 1) for rank in range(len(AUTHORS))]
+
+
+def sequence_id(number: int) -> str:
+    return f"A{number:06d}"
+
+
+def sentence(rnd: random.Random, low: int = 6, high: int = 24) -> str:
+    text = " ".join(rnd.choices(WORDS, k=rnd.randint(low, high)))
+    return text[0].upper() + text[1:] + "."
+
+
+def attribution(rnd: random.Random) -> str:
+    author = rnd.choices(AUTHORS, weights=AUTHOR_WEIGHTS)[0]
+    return f"_{author}_, {rnd.choice(MONTHS)} {rnd.randint(1, 28)} {rnd.randint(1964, 2024)}"
+
+
+def make_entry(number: int, seed: int = 0, total: int = 1_000) -> Dict:
+    """One synthetic sequence entry as plain fields (shared by the .seq and HTML writers)"""
+    rnd = random.Random(seed * 10_000_019 + number)
+    seq_id = sequence_id(number)
+    size = rnd.choice([2, 3, 4, 8, 20])
+    terms = [str(rnd.randint(0, 10 ** rnd.randint(1, size))) for _ in range(rnd.randint(20, 60))]
+    # Cross-references mostly point at nearby sequences, sometimes anywhere in the corpus
+    crossrefs = sorted({sequence_id(max(1, min(total, number + rnd.randint(-20, 20))
+                                        if rnd.random() < 0.7 else rnd.randint(1, total)))
+                        for _ in range(rnd.randint(1, 8))} - {seq_id})
+    return {
+        "id": seq_id,
+        "terms": terms,
+        "name": sentence(rnd, 4, 16),
+        "comments": [sentence(rnd) + (f" - {attribution(rnd)}" if rnd.random() < 0.5 else "")
+                     for _ in range(int(min(rnd.expovariate(0.4), 30)))],
+        "references": [f"{rnd.choice(BOOKS)}, p. {rnd.randint(1, 900)}."
+                       for _ in range(int(min(rnd.expovariate(0.6), 12)))],
+        "links": [f"{rnd.choices(AUTHORS, weights=AUTHOR_WEIGHTS)[0]}, "
+                  f"<a href=\"/{seq_id}/b{seq_id[1:]}.txt\">Table of n, a(n) for n = 0..{rnd.randint(100, 10000)}</a>"
+                  for _ in range(1 + int(min(rnd.expovariate(0.5), 15)))],
+        "formulas": [f"a(n) = {rnd.choice(FORMULAS).format(k=rnd.randint(1, 99))}."
+                     for _ in range(int(min(rnd.expovariate(0.5), 15)))],
+        "example": f"a(3) = {terms[min(3, len(terms) - 1)]}.",
+        "crossrefs": crossrefs,
+        "keywords": sorted(set(rnd.sample(KEYWORDS, rnd.randint(1, 4))) | {"nonn"}),
+        "offset": f"{rnd.randint(0, 1)},{rnd.randint(1, 5)}",
+        "author": attribution(rnd),
+    }
+
+
+def seq_lines(entry: Dict) -> List[str]:
+    """Entry in the internal format, terms wrapped over %S/%T/%U like the real files"""
+    seq_id = entry["id"]
+    terms = entry["terms"]
+    third = max(1, len(terms) // 3)
+    lines = [f"%I {seq_id}"]
+    for code, chunk in (("%S", terms[:third]), ("%T", terms[third:2 * third]), ("%U", terms[2 * third:])):
+        if chunk:
+            lines.append(f"{code} {seq_id} " + ",".join(chunk) + ("," if code != "%U" else ""))
+    lines.append(f"%N {seq_id} {entry['name']}")
+    lines += [f"%C {seq_id} {text}" for text in entry["comments"]]
+    lines += [f"%D {seq_id} {text}" for text in entry["references"]]
+    lines += [f"%H {seq_id} {text}" for text in entry["links"]]
+    lines += [f"%F {seq_id} {text}" for text in entry["formulas"]]
+    lines.append(f"%e {seq_id} {entry['example']}")
+    lines.append(f"%Y {seq_id} Cf. {', '.join(entry['crossrefs'])}.")
+    lines.append(f"%K {seq_id} {','.join(entry['keywords'])}")
+    lines.append(f"%O {seq_id} {entry['offset']}")
+    lines.append(f"%A {seq_id} {entry['author']}")
+    return lines
+
+
+def link_crossrefs(text: str) -> str:
+    """Escape a line for HTML, turning every sequence ID into a link as oeis.org does"""
+    words = []
+    for word in html.escape(text, quote=False).split(" "):
+        core = word.rstrip(".,;")
+        if len(core) == 7 and core[0] == "A" and core[1:].isdigit():
+            word = f'<a href="/{core}" title="{core}">{core}</a>{word[len(core):]}'
+        words.append(word)
+    return " ".join(words)
+
+
+PAGE_HEADER = """<!DOCTYPE html>
+<html>
+  <head>
+    <meta charset="utf-8">
+    <title>{seq_id} - OEIS</title>
+    <link rel="stylesheet" href="/styles.css">
+  </head>
+  <body>
+    <div class="loginbar"><div class="login"><a href="/login">login</a></div></div>
+    <div class="center"><div class="top"><div class="linksbar">
+      <a href="/">OEIS</a> <a href="/search">search</a> <a href="/recent">recent</a> <a href="/welcome">welcome</a>
+    </div></div></div>
+    <div class="center"><div class="searchbar"><div class="searchbarcenter"><form action="/search">
+      <div class="searchq"><input name="q" value="{seq_id}"></div>
+      <div class="searchsubmit"><input type="submit" value="Search"></div>
+    </form></div></div></div>
+    <div class="sequence">
+      <div class="seqhead">
+        <div class="seqnumname">
+          <div class="seqnum">{seq_id}</div>
+          <div class="seqname">{name}</div>
+        </div>
+        <div class="scorerefs">{refs}</div>
+      </div>
+      <div><div class="seqdatabox">
+        <div class="seqdata">{terms}</div>
+        <div class="seqdatalinks">(<a href="/{seq_id}/list">list</a>; <a href="/{seq_id}/graph">graph</a>;
+          <a href="/search?q={seq_id}+-id:{seq_id}">refs</a>; <a href="/{seq_id}/internal">internal format</a>)</div>
+      </div></div>
+      <div class="entry">
+"""
+
+PAGE_FOOTER = """      </div>
+    </div>
+    <div class="footer"><div class="bottom"><div class="linksbar">
+      <a href="/">Lookup</a> | <a href="/welcome">Welcome</a> | <a href="/wiki/Main_Page">Wiki</a> |
+      <a href="/wiki/Register">Register</a> | <a href="/play.html">Music</a> | <a href="/Plot2.html">Plot 2</a> |
+      <a href="/demo1.html">Demos</a> | <a href="/wiki/Index_to_OEIS">Index</a> | <a href="/webcam">WebCam</a> |
+      <a href="/Submit.html">Contribute</a> | <a href="/eishelp2.html">Format</a> | <a href="/wiki/Style_Sheet">Style Sheet</a>
+    </div></div>
+    <div class="legal">Content is available under The OEIS End-User License Agreement.</div></div>
+  </body>
+</html>
+"""
+
+
+def html_page(entry: Dict) -> str:
+    seq_id = entry["id"]
+    sections = [
+        ("OFFSET", [entry["offset"]]),
+        ("COMMENTS", entry["comments"]),
+        ("REFERENCES", entry["references"]),
+        ("LINKS", entry["links"]),
+        ("FORMULA", entry["formulas"]),
+        ("EXAMPLE", [entry["example"]]),
+        ("CROSSREFS", [f"Cf. {', '.join(entry['crossrefs'])}."]),
+        ("KEYWORD", [",".join(entry["keywords"])]),
+        ("AUTHOR", [entry["author"]]),
+        ("STATUS", ["approved"]),
+    ]
+    parts = [PAGE_HEADER.format(seq_id=seq_id, name=html.escape(entry["name"]), refs=len(entry["crossrefs"]),
+                                terms=", ".join(entry["terms"]))]
+    for name, lines in sections:
+        if not lines:
+            continue
+        parts.append(f'        <div class="section">\n          <div class="sectname">{name}</div>\n'
+                     f'          <div class="sectbody">\n')
+        for line in lines:
+            # LINKS lines already hold their anchor
+            text = line if name == "LINKS" else link_crossrefs(line)
+            parts.append(f'            <div class="sectline">{text}</div>\n')
+        parts.append("          </div>\n        </div>\n")
+    parts.append(PAGE_FOOTER)
+    return "".join(parts)
+
+
+def entry_path(root: str, seq_id: str, extension: str) -> str:
+    return os.path.join(root, seq_id[:4], f"{seq_id}.{extension}")
+
+
+def iter_entries(count: int, seed: int = 0) -> Iterator[Dict]:
+    for number in range(1, count + 1):
+        yield make_entry(number, seed, count)
+
+
+def generate_corpus(root: str, count: int, seed: int = 0, html_pages: int = None) -> Dict[str, int]:
+    """Write count .seq files under root/seq and the first html_pages of them as HTML under root/html.
+    Files that already exist are kept, so an interrupted generation can simply be restarted."""
+    html_pages = count if html_pages is None else min(html_pages, count)
+    written = {"seq": 0, "html": 0}
+    for entry in iter_entries(count, seed):
+        seq_path = entry_path(os.path.join(root, "seq"), entry["id"], "seq")
+        if not os.path.exists(seq_path):
+            os.makedirs(os.path.dirname(seq_path), exist_ok=True)
+            with open(seq_path, "w", encoding="utf8") as file:
+                file.write("\n".join(seq_lines(entry)) + "\n")
+            written["seq"] += 1
+        if int(entry["id"][1:]) <= html_pages:
+            html_path = entry_path(os.path.join(root, "html"), entry["id"], "html")
+            if not os.path.exists(html_path):
+                os.makedirs(os.path.dirname(html_path), exist_ok=True)
+                with open(html_path, "w", encoding="utf8") as file:
+                    file.write(html_page(entry))
+                written["html"] += 1
+    return written
+
+
+def corpus_files(root: str, kind: str) -> List[str]:
+    """Sorted paths of the generated files of one kind ("seq" or "html")"""
+    base = os.path.join(root, kind)
+    paths = []
+    for folder in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+        folder_path = os.path.join(base, folder)
+        paths.extend(os.path.join(folder_path, name) for name in sorted(os.listdir(folder_path)))
+    return paths
@@ -0,0 +1,106 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import neo4j
+
+# In-process stand-in for the Neo4j driver, enough of the API for the loaders and writers:
+# driver.session(), session.run / execute_write / execute_read, tx.run(...).consume().
+# Nothing is stored; queries and UNWIND rows are only counted. tx_latency and row_latency
+# (seconds) add a simulated server round trip per transaction and cost per row, as a sleep
+# that releases the GIL, so concurrent writers overlap the way they would against a server.
+
+
+class FakeResult:
+    def consume(self):
+        return None
+
+    def single(self):
+        return None
+
+    def data(self):
+        return []
+
+    def __iter__(self):
+        return iter(())
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, parameters=None, **kwargs):
+        parameters = dict(parameters or {}, **kwargs)
+        rows = sum(len(value) for value in parameters.values() if isinstance(value, (list, dict)))
+        self.driver.count(rows)
+        if self.driver.row_latency and rows:
+            time.sleep(self.driver.row_latency * rows)
+        return FakeResult()
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        return self.execute_write(lambda tx: tx.run(query, parameters, **kwargs))
+
+    def execute_write(self, work, *args, **kwargs):
+        self.driver.begin()
+        if self.driver.tx_latency:
+            time.sleep(self.driver.tx_latency)
+        return work(FakeTransaction(self.driver), *args, **kwargs)
+
+    execute_read = execute_write
+
+    def close(self):
+        pass
+
+
+class FakeDriver:
+    def __init__(self, tx_latency: float = 0.0, row_latency: float = 0.0):
+        self.tx_latency = tx_latency
+        self.row_latency = row_latency
+        self.lock = threading.Lock()
+        self.transactions = 0
+        self.queries = 0
+        self.rows = 0
+
+    def begin(self):
+        with self.lock:
+            self.transactions += 1
+
+    def count(self, rows: int):
+        with self.lock:
+            self.queries += 1
+            self.rows += rows
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"transactions": self.transactions, "queries": self.queries, "rows": self.rows}
+
+
+@contextmanager
+def fake_neo4j(tx_latency: float = 0.0, row_latency: float = 0.0):
+    """Make GraphDatabase.driver return one shared FakeDriver inside the block"""
+    driver = FakeDriver(tx_latency, row_latency)
+    original = neo4j.GraphDatabase.driver
+    neo4j.GraphDatabase.driver = lambda *args, **kwargs: driver
+    try:
+        yield driver
+    finally:
+        neo4j.GraphDatabase.driver = original
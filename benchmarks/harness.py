@@ -0,0 +1,124 @@
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted values (0.0 when empty)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer:
+    """Per-operation latencies and totals of one benchmark stage.
+    `items` counts the work units the throughput is reported in (sequences, pages, rows),
+    which may differ from the number of timed operations (e.g. one flush writes many rows)."""
+
+    def __init__(self, name: str, unit: str = "items"):
+        self.name = name
+        self.unit = unit
+        self.latencies = []
+        self.items = 0
+        self.seconds = 0.0
+        self.extra = {}
+        # Peak RSS before the first operation, i.e. the interpreter plus imported modules
+        self.start_rss = peak_rss_mb()
+
+    @contextmanager
+    def measure(self, items: int = 1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.latencies.append(elapsed)
+            self.seconds += elapsed
+            self.items += items
+
+    def result(self, wall_seconds: float = None) -> Dict:
+        """Summary; throughput uses wall_seconds when the stage overlaps work (threads, asyncio)"""
+        seconds = wall_seconds if wall_seconds is not None else self.seconds
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "operations": len(self.latencies),
+            "seconds": round(seconds, 4),
+            "throughput": round(self.items / seconds, 2) if seconds else 0.0,
+            "p50_ms": round(percentile(self.latencies, 0.50) * 1000, 4),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 4),
+            "start_rss_mb": round(self.start_rss, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            **self.extra,
+        }
+
+
+def run_isolated(stage: Callable, *args) -> Dict:
+    """Run stage(*args) in a fresh interpreter so its peak RSS is its own"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(stage, *args).result()
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def save_results(path: str, results: Dict):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+
+
+def print_results(results: Dict):
+    print(f"{'stage':<22} {'throughput':>16} {'p50 ms':>10} {'p99 ms':>10} {'peak RSS MB':>12}")
+    for name, stage in results["stages"].items():
+        rate = f"{stage['throughput']:.0f} {stage['unit']}/s"
+        print(f"{name:<22} {rate:>16} {stage['p50_ms']:>10.3f} {stage['p99_ms']:>10.3f} {stage['peak_rss_mb']:>12.1f}")
+
+
+def compare_results(old_path: str, new_path: str):
+    """Print throughput and latency changes of every stage present in both result files"""
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)
+    print(f"{old_path} ({old['environment']['git_commit']}) -> {new_path} ({new['environment']['git_commit']})")
+    if old["corpus"] != new["corpus"] or old["options"] != new["options"]:
+        print(f"Warning: different corpus or options ({old['corpus']} vs {new['corpus']})")
+    print(f"{'stage':<22} {'throughput':>12} {'p50':>10} {'p99':>10} {'peak RSS':>10}")
+    for name, stage in new["stages"].items():
+        before = old["stages"].get(name)
+        if before is None:
+            continue
+
+        def change(key):
+            return f"{(stage[key] / before[key] - 1) * 100:+.1f}%" if before[key] else "n/a"
+
+        print(f"{name:<22} {change('throughput'):>12} {change('p50_ms'):>10} {change('p99_ms'):>10} "
+              f"{change('peak_rss_mb'):>10}")
@@ -0,0 +1,160 @@
+import os
+import time
+import asyncio
+from typing import Dict
+
+from benchmarks.corpus import corpus_files, iter_entries
+from benchmarks.fake_neo4j import fake_neo4j
+from benchmarks.harness import StageTimer
+
+# Benchmark stages. Each one takes the corpus root and the run options and returns the
+# StageTimer summary; they run in a fresh process each (see harness.run_isolated), so the
+# modules under test are imported inside the stage and the peak RSS belongs to that stage.
+
+
+def seq_parse(root: str, options: Dict) -> Dict:
+    """load_oeis_batch.parse_seq_file over every .seq file"""
+    from load_oeis_batch import parse_seq_file
+    timer = StageTimer("seq_parse", "sequences")
+    for path in corpus_files(root, "seq"):
+        with timer.measure():
+            parse_seq_file(path)
+    return timer.result()
+
+
+def seq_sections(root: str, options: Dict) -> Dict:
+    """oeis_sources.parse_seq_sections, the local source of the entity extractor"""
+    from oeis_sources import parse_seq_sections
+    timer = StageTimer("seq_sections", "sequences")
+    for path in corpus_files(root, "seq"):
+        with timer.measure():
+            with open(path, "r", encoding="utf8") as file:
+                parse_seq_sections(file)
+    return timer.result()
+
+
+def load_folders(root: str, loader):
+    from load_oeis_batch import process_all_seq_files
+    seq_root = os.path.join(root, "seq")
+    for folder in sorted(os.listdir(seq_root)):
+        process_all_seq_files(os.path.join(seq_root, folder), loader)
+
+
+def loader(root: str, options: Dict, writers: int, name: str) -> Dict:
+    """OEISLoader bulk mode; every flush is one timed operation"""
+    from load_oeis_batch import OEISLoader
+    timer = StageTimer(name, "sequences")
+    with fake_neo4j(options["tx_latency"], options["row_latency"]) as driver:
+        oeis_loader = OEISLoader("neo4j://bench", "neo4j", "bench", batch_size=options["batch_size"], writers=writers)
+        flush = oeis_loader.flush
+
+        def timed_flush():
+            with timer.measure(len(oeis_loader.pending)):
+                return flush()
+
+        oeis_loader.flush = timed_flush
+        start = time.perf_counter()
+        load_folders(root, oeis_loader)
+        oeis_loader.close()
+        wall = time.perf_counter() - start
+    timer.extra = driver.stats()
+    return timer.result(wall)
+
+
+def loader_bulk(root: str, options: Dict) -> Dict:
+    return loader(root, options, 1, "loader_bulk")
+
+
+def loader_parallel(root: str, options: Dict) -> Dict:
+    return loader(root, options, options["writers"], "loader_parallel")
+
+
+def loader_merge(root: str, options: Dict) -> Dict:
+    """OEISLoader per-MERGE mode (batch_size=0) on the first merge_limit sequences"""
+    from load_oeis_batch import OEISLoader, parse_seq_file, load_to_neo4j
+    timer = StageTimer("loader_merge", "sequences")
+    with fake_neo4j(options["tx_latency"], options["row_latency"]) as driver:
+        oeis_loader = OEISLoader("neo4j://bench", "neo4j", "bench", batch_size=0)
+        for path in corpus_files(root, "seq")[:options["merge_limit"]]:
+            seq_data = parse_seq_file(path)
+            with timer.measure():
+                load_to_neo4j(seq_data, oeis_loader)
+        oeis_loader.close()
+    timer.extra = driver.stats()
+    return timer.result()
+
+
+def html_stage(root: str, name: str, parse) -> Dict:
+    timer = StageTimer(name, "pages")
+    for path in corpus_files(root, "html"):
+        with open(path, "r", encoding="utf8") as file:
+            content = file.read()
+        sequence_number = os.path.basename(path)[:7]
+        with timer.measure():
+            parse(sequence_number, content)
+    return timer.result()
+
+
+def html_links_soup(root: str, options: Dict) -> Dict:
+    """The BeautifulSoup section walk of OEISProcessor"""
+    from oeis_html import parse_sequence_links
+    return html_stage(root, "html_links_soup", parse_sequence_links)
+
+
+def html_links_fast(root: str, options: Dict) -> Dict:
+    from oeis_html import parse_sequence_links_fast
+    return html_stage(root, "html_links_fast", parse_sequence_links_fast)
+
+
+def html_sections(root: str, options: Dict) -> Dict:
+    """oeis_html.parse_sections, the HTTP source of the entity extractor"""
+    from oeis_html import parse_sections
+    return html_stage(root, "html_sections", lambda sequence_number, content: parse_sections(content))
+
+
+def neo4j_worker(root: str, options: Dict) -> Dict:
+    """OEISProcessor.neo4j_worker draining cross-reference rows of the whole corpus; one write_batch per operation"""
+    from neo4j_performance_optimization import OEISProcessor
+    timer = StageTimer("neo4j_worker", "relationships")
+
+    async def run(processor):
+        processor.results_queue = asyncio.Queue(maxsize=processor.results_queue_size)
+        writer = asyncio.create_task(processor.neo4j_worker())
+        for entry in iter_entries(options["count"], options["seed"]):
+            rows = [{"from_id": entry["id"], "to_id": ref, "relationship": "CROSSREFS"} for ref in entry["crossrefs"]]
+            await processor.results_queue.put((entry["id"], rows))
+        await processor.results_queue.put(None)
+        await writer
+
+    with fake_neo4j(options["tx_latency"], options["row_latency"]) as driver:
+        processor = OEISProcessor("neo4j://bench", "neo4j", "bench", neo4j_writers=options["writers"])
+        write_batch = processor.write_batch
+
+        def timed_write_batch(batch):
+            with timer.measure(len(batch)):
+                return write_batch(batch)
+
+        processor.write_batch = timed_write_batch
+        if options["writers"] > 1:
+            from parallel_writer import ParallelWriter
+            processor.neo4j_writer = ParallelWriter(processor.driver, options["writers"])
+        start = time.perf_counter()
+        asyncio.run(run(processor))
+        wall = time.perf_counter() - start
+        if processor.neo4j_writer:
+            processor.neo4j_writer.close()
+    timer.extra = driver.stats()
+    return timer.result(wall)
+
+
+STAGES = {
+    "seq_parse": seq_parse,
+    "seq_sections": seq_sections,
+    "loader_merge": loader_merge,
+    "loader_bulk": loader_bulk,
+    "loader_parallel": loader_parallel,
+    "html_links_soup": html_links_soup,
+    "html_links_fast": html_links_fast,
+    "html_sections": html_sections,
+    "neo4j_worker": neo4j_worker,
+}
@@ -0,0 +1,53 @@
+import os
+import time
+
+
+class Checkpoint:
+    """Append-only log of sequence IDs whose results are committed to Neo4j, fsynced every flush_interval seconds"""
+
+    def __init__(self, path: str = "oeis_checkpoint.log", flush_interval: float = 30.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self.completed.update(line.strip() for line in file if line.strip())
+        self.file = open(path, "a")
+        self.pending = []
+        self.last_flush = time.time()
+
+    def is_done(self, sequence_number: str) -> bool:
+        return sequence_number in self.completed
+
+    def reset(self) -> str:
+        """Start an empty log (a run with --fresh). The old log is renamed, not truncated;
+        returns its new path, or None if there was nothing to keep"""
+        self.flush()
+        self.file.close()
+        backup = None
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            backup = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(self.path, backup)
+        self.file = open(self.path, "w")
+        self.completed.clear()
+        self.pending = []
+        return backup
+
+    def mark(self, sequence_numbers):
+        """Record sequences whose relationships were just committed"""
+        self.pending.extend(sequence_numbers)
+        self.completed.update(sequence_numbers)
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write("".join(f"{sequence_number}\n" for sequence_number in self.pending))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.pending = []
+        self.last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        self.file.close()
@@ -0,0 +1,127 @@
+import os
+import csv
+import argparse
+
+from load_oeis_recursive import parse_seq_lines
+from oeis_dump import iter_dump_records
+
+# CSV files written for `neo4j-admin database import`, with their header rows
+NODE_FILES = {
+    "sequences": ["id:ID(Sequence)", "description", ":LABEL"],
+    "authors": ["name:ID(Author)", ":LABEL"],
+    "references": ["citation:ID(Reference)", ":LABEL"],
+}
+
+RELATIONSHIP_FILES = {
+    "has_author": [":START_ID(Sequence)", ":END_ID(Author)", ":TYPE"],
+    "has_reference": [":START_ID(Sequence)", ":END_ID(Reference)", ":TYPE"],
+    "crossrefs": [":START_ID(Sequence)", ":END_ID(Sequence)", ":TYPE"],
+}
+
+
+class Neo4jImportExporter:
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.files = {}
+        self.writers = {}
+        for name, header in {**NODE_FILES, **RELATIONSHIP_FILES}.items():
+            self.files[name] = open(self.path(name), "w", encoding="utf8", newline="")
+            self.writers[name] = csv.writer(self.files[name])
+            self.writers[name].writerow(header)
+
+        # Exact keys of the author and reference nodes already written; a few hundred thousand
+        # short strings for the full OEIS, and unlike a digest they can never drop a node
+        self.authors = set()
+        self.references = set()
+        # Sequence numbers are kept as ints so the sets stay small even for the full dump
+        self.sequence_numbers = set()
+        self.crossref_targets = set()
+        self.sequence_count = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name + ".csv")
+
+    def add_sequence(self, seq_data: dict):
+        seq_id = seq_data["id"]
+        if not seq_id:
+            return
+        self.writers["sequences"].writerow([seq_id, seq_data["description"] or "", "Sequence"])
+        self.sequence_numbers.add(int(seq_id[1:]))
+        self.sequence_count += 1
+
+        for author in dict.fromkeys(seq_data["authors"]):
+            if author not in self.authors:
+                self.authors.add(author)
+                self.writers["authors"].writerow([author, "Author"])
+            self.writers["has_author"].writerow([seq_id, author, "HAS_AUTHOR"])
+
+        for ref in dict.fromkeys(seq_data["references"]):
+            if ref not in self.references:
+                self.references.add(ref)
+                self.writers["references"].writerow([ref, "Reference"])
+            self.writers["has_reference"].writerow([seq_id, ref, "HAS_REFERENCE"])
+
+        for ref in seq_data["crossrefs"]:
+            self.crossref_targets.add(int(ref[1:]))
+            self.writers["crossrefs"].writerow([seq_id, ref, "CROSSREFS"])
+
+    def close(self):
+        # Cross-referenced sequences outside the exported tree still need a node
+        for number in sorted(self.crossref_targets - self.sequence_numbers):
+            self.writers["sequences"].writerow([f"A{number:06d}", "", "Sequence"])
+        for file in self.files.values():
+            file.close()
+
+    def import_command(self, database: str = "neo4j") -> str:
+        args = [f"--nodes={self.path(name)}" for name in NODE_FILES]
+        args += [f"--relationships={self.path(name)}" for name in RELATIONSHIP_FILES]
+        return "neo4j-admin database import full --overwrite-destination " + " ".join(args) + " " + database
+
+
+# Walk seq/A000 ... seq/Axxx in order and stream every sequence into the CSV files
+def export_seq_tree(seq_dir: str, output_dir: str, first: int = 0, last: int = 376) -> Neo4jImportExporter:
+    exporter = Neo4jImportExporter(output_dir)
+    try:
+        for i in range(first, last + 1):
+            folder_path = os.path.join(seq_dir, 'A' + '{num:03d}'.format(num=i))
+            if not os.path.isdir(folder_path):
+                continue
+            for file_name in sorted(os.listdir(folder_path)):
+                if file_name.endswith(".seq"):
+                    with open(os.path.join(folder_path, file_name), 'r', encoding='utf8') as file:
+                        exporter.add_sequence(parse_seq_lines(file))
+            print(folder_path)
+    finally:
+        exporter.close()
+    return exporter
+
+
+# Same export, reading a single concatenated dump file (see oeis_dump.py)
+def export_dump_file(dump_path: str, output_dir: str) -> Neo4jImportExporter:
+    exporter = Neo4jImportExporter(output_dir)
+    try:
+        for seq_data in iter_dump_records(dump_path):
+            exporter.add_sequence(seq_data)
+    finally:
+        exporter.close()
+    return exporter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write neo4j-admin import CSVs for the OEIS seq/ tree")
+    parser.add_argument("--seq-dir", default="seq/")
+    parser.add_argument("--output-dir", default="neo4j_import/")
+    parser.add_argument("--first", type=int, default=0, help="first folder number (A000)")
+    parser.add_argument("--last", type=int, default=376, help="last folder number (A376)")
+    parser.add_argument("--dump", help="read a single concatenated dump file instead of the seq/ tree")
+    args = parser.parse_args()
+
+    if args.dump:
+        exporter = export_dump_file(args.dump, args.output_dir)
+    else:
+        exporter = export_seq_tree(args.seq_dir, args.output_dir, args.first, args.last)
+    print(f"Exported {exporter.sequence_count} sequences to {args.output_dir}")
+    print("Stop Neo4j and run:")
+    print(exporter.import_command())
+    print("Then start Neo4j and create the constraints with: python oeis_schema.py")
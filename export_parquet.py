@@ -0,0 +1,129 @@
+import os
+import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from load_oeis_recursive import SEQ_ID_PATTERN, find_seq_folders
+
+# Field names from the `OEIS github extraction.ipynb` key_map
+key_map = {
+    "I": "id",
+    "N": "name",
+    "C": "comments",
+    "D": "references",
+    "H": "related_links",
+    "F": "formula",
+    "e": "examples",
+    "p": "maple_program",
+    "t": "mathematica_program",
+    "o": "other_program",
+    "Y": "cross_references",
+    "K": "keywords",
+    "O": "offset",
+    "A": "author"
+}
+
+# Text fields that may span several lines and are joined with spaces, as in the notebook
+TEXT_FIELDS = ["comments", "references", "related_links", "formula", "examples",
+               "maple_program", "mathematica_program", "other_program", "cross_references"]
+
+SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("name", pa.string()),
+        ("offset", pa.int32()),
+        ("keywords", pa.list_(pa.string())),
+        ("authors", pa.list_(pa.string())),
+        ("crossrefs", pa.list_(pa.string())),
+        # Terms stay decimal strings: many OEIS values do not fit in 64 bits
+        ("terms", pa.list_(pa.string())),
+    ]
+    + [(field, pa.string()) for field in TEXT_FIELDS]
+)
+
+LINE_PATTERN = re.compile(r"%(\w) (A\d+) ?(.*)")
+
+
+def parse_sequence_file(file_content: str) -> dict:
+    """Parse one .seq file into a typed row matching SCHEMA"""
+    row = {field.name: None for field in SCHEMA}
+    row.update(keywords=[], authors=[], crossrefs=[], terms=[])
+    text = {field: [] for field in TEXT_FIELDS}
+
+    for line in file_content.splitlines():
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        key, seq_id, value = match.group(1), match.group(2), match.group(3).strip()
+        if key == "I":
+            row["id"] = seq_id
+        elif key in ("S", "T", "U"):
+            row["terms"].extend(term.strip() for term in value.strip(", ").split(",") if term.strip())
+        elif key == "N":
+            row["name"] = value
+        elif key == "O":
+            row["offset"] = int(value.split(",")[0]) if value else None
+        elif key == "K":
+            row["keywords"] = [keyword for keyword in value.split(",") if keyword]
+        elif key == "A":
+            row["authors"].append(value)
+        elif key in key_map and key_map[key] in text:
+            text[key_map[key]].append(value)
+            if key == "Y":
+                row["crossrefs"].extend(SEQ_ID_PATTERN.findall(value))
+
+    row["crossrefs"] = [ref for ref in dict.fromkeys(row["crossrefs"]) if ref != row["id"]]
+    for field, lines in text.items():
+        row[field] = " ".join(lines) if lines else None
+    return row
+
+
+# Write one folder (e.g. seq/A000) as its own partition: <output_dir>/folder=A000/part-0.parquet
+def export_folder(folder_path: str, output_dir: str) -> int:
+    rows = []
+    for file_name in sorted(os.listdir(folder_path)):
+        if file_name.endswith(".seq"):
+            with open(os.path.join(folder_path, file_name), "r", encoding="utf8") as file:
+                rows.append(parse_sequence_file(file.read()))
+
+    partition_dir = os.path.join(output_dir, "folder=" + os.path.basename(os.path.normpath(folder_path)))
+    os.makedirs(partition_dir, exist_ok=True)
+    table = pa.Table.from_pylist(rows, schema=SCHEMA)
+    pq.write_table(table, os.path.join(partition_dir, "part-0.parquet"), compression="zstd")
+    return len(rows)
+
+
+def export_seq_tree(seq_dir: str, output_dir: str, workers: int = 1) -> int:
+    folders = find_seq_folders(seq_dir)
+    total = 0
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = executor.map(export_folder, folders, [output_dir] * len(folders))
+            for folder_path, count in zip(folders, counts):
+                total += count
+                print(folder_path)
+    else:
+        for folder_path in folders:
+            total += export_folder(folder_path, output_dir)
+            print(folder_path)
+    return total
+
+
+def load_corpus(dataset_dir: str, columns=None) -> pd.DataFrame:
+    """Load the exported corpus, reading only the requested columns"""
+    return pd.read_parquet(dataset_dir, columns=columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the OEIS seq/ tree as partitioned Parquet files")
+    parser.add_argument("seq_dir", nargs="?", default="seq/")
+    parser.add_argument("output_dir", nargs="?", default="parquet_output/")
+    parser.add_argument("--workers", type=int, default=1, help="folders exported in parallel")
+    args = parser.parse_args()
+
+    total = export_seq_tree(args.seq_dir, args.output_dir, args.workers)
+    print(f"Exported {total} sequences to {args.output_dir}")
@@ -0,0 +1,119 @@
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+from aiohttp import web
+
+# Local stand-in for the OpenAI chat completions endpoint, for exercising the
+# extraction pipeline without an API key:
+#   python fake_openai_server.py --latency 1.5 &
+#   OPENAI_API_KEY=fake python oeis_entity_extractor.py --llm-base-url http://127.0.0.1:8080/v1
+# and for the offline batch API round trip:
+#   python fake_openai_server.py --batch-input requests.jsonl --batch-output results.jsonl
+
+WORD_PATTERN = re.compile(r"\b[a-z]{9,}\b")
+ENTRY_HEADER_PATTERN = re.compile(r"^[ \t]*=== (A\d{6}) ===[ \t]*$", re.MULTILINE)
+
+
+def fake_entities(text: str) -> dict:
+    """Deterministic answer built from the prompt text: its first few long words count as concepts"""
+    text = text.split("Text to analyze:", 1)[-1]
+    return {"mathematical_concepts": list(dict.fromkeys(WORD_PATTERN.findall(text.lower())))[:5]}
+
+
+def fake_answer(prompt: str) -> dict:
+    """Single-sequence answer, or one keyed by sequence ID for a batched prompt"""
+    parts = ENTRY_HEADER_PATTERN.split(prompt)
+    if len(parts) == 1:
+        return fake_entities(prompt)
+    # parts = [preamble, id1, text1, id2, text2, ...]
+    return {sequence_id: fake_entities(text) for sequence_id, text in zip(parts[1::2], parts[2::2])}
+
+
+def fake_completion(payload: dict, request_number: int, malformed_rate: float = 0.0) -> dict:
+    """Chat completion body for a request payload; malformed_rate answers are cut off mid-JSON"""
+    content = json.dumps(fake_answer(payload["messages"][-1]["content"]))
+    if random.random() < malformed_rate:
+        content = content[:len(content) // 2]
+    prompt_tokens = sum(len(message["content"]) for message in payload["messages"]) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-fake-{request_number}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def create_app(latency: float = 1.0, jitter: float = 0.5, error_rate: float = 0.0,
+               malformed_rate: float = 0.0) -> web.Application:
+    stats = {"requests": 0, "errors": 0}
+
+    async def chat_completions(request):
+        stats["requests"] += 1
+        payload = await request.json()
+        await asyncio.sleep(max(0.0, random.gauss(latency, jitter)))
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": {"message": "Rate limit reached", "type": "requests"}},
+                                     status=429, headers={"Retry-After": "1"})
+        return web.json_response(fake_completion(payload, stats["requests"], malformed_rate))
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def answer_batch_file(input_path: str, output_path: str, error_rate: float = 0.0, malformed_rate: float = 0.0) -> int:
+    """Answer a batch API requests file with a results file in the batch API's output format"""
+    count = 0
+    with open(input_path, encoding="utf-8") as requests_file, open(output_path, "w", encoding="utf-8") as results_file:
+        for count, line in enumerate(requests_file, 1):
+            request = json.loads(line)
+            if random.random() < error_rate:
+                result = {"status_code": 500, "request_id": f"req-fake-{count}", "body": {"error": {"message": "Server error"}}}
+            else:
+                result = {"status_code": 200, "request_id": f"req-fake-{count}",
+                          "body": fake_completion(request["body"], count, malformed_rate)}
+            results_file.write(json.dumps({
+                "id": f"batch-req-fake-{count}",
+                "custom_id": request["custom_id"],
+                "response": result,
+                "error": None
+            }) + "\n")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible completion server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=1.0, help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.5, help="standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of answers with truncated JSON")
+    parser.add_argument("--batch-input", help="answer this batch requests file instead of serving HTTP")
+    parser.add_argument("--batch-output", default="batch_results.jsonl", help="results file for --batch-input")
+    args = parser.parse_args()
+
+    if args.batch_input:
+        count = answer_batch_file(args.batch_input, args.batch_output, args.error_rate, args.malformed_rate)
+        print(f"Answered {count} requests into {args.batch_output}")
+    else:
+        web.run_app(create_app(args.latency, args.jitter, args.error_rate, args.malformed_rate),
+                    host="127.0.0.1", port=args.port)
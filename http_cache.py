@@ -0,0 +1,190 @@
+import os
+import time
+import sqlite3
+import hashlib
+
+import aiohttp
+
+# Point this at a local stub server to run the scrapers without touching oeis.org
+OEIS_BASE_URL = os.getenv("OEIS_BASE_URL", "https://oeis.org")
+
+
+class CachedResponse:
+    def __init__(self, status: int, body: bytes, headers=None, from_cache: bool = False):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of page bodies with ETag/Last-Modified revalidation and LRU eviction"""
+
+    def __init__(self, cache_dir: str = ".oeis_cache", ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.db"))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE INDEX IF NOT EXISTS entries_body_hash ON entries (body_hash);
+            CREATE TABLE IF NOT EXISTS objects (
+                body_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        """)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def object_path(self, body_hash: str) -> str:
+        return os.path.join(self.cache_dir, "objects", body_hash[:2], body_hash)
+
+    def lookup(self, url: str):
+        row = self.conn.execute(
+            "SELECT body_hash, etag, last_modified, fetched_at FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        if row and not os.path.exists(self.object_path(row[0])):
+            return None
+        return row
+
+    def read_body(self, body_hash: str) -> bytes:
+        with open(self.object_path(body_hash), "rb") as file:
+            return file.read()
+
+    def request_headers(self, row) -> dict:
+        """Conditional GET headers for a stale entry"""
+        headers = {}
+        if row and row[1]:
+            headers["If-None-Match"] = row[1]
+        if row and row[2]:
+            headers["If-Modified-Since"] = row[2]
+        return headers
+
+    def cached(self, url: str, row, revalidated: bool = False) -> CachedResponse:
+        now = time.time()
+        if revalidated:
+            self.conn.execute("UPDATE entries SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self.revalidated += 1
+        else:
+            self.conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, url))
+            self.hits += 1
+        self.conn.commit()
+        return CachedResponse(200, self.read_body(row[0]), from_cache=True)
+
+    def store(self, url: str, body: bytes, headers) -> None:
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self.object_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as file:
+                file.write(body)
+            os.replace(path + ".tmp", path)
+        self.conn.execute("INSERT OR IGNORE INTO objects (body_hash, size) VALUES (?, ?)", (body_hash, len(body)))
+
+        old = self.conn.execute("SELECT body_hash FROM entries WHERE url = ?", (url,)).fetchone()
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+            (url, body_hash, headers.get("ETag"), headers.get("Last-Modified"), now, now)
+        )
+        if old and old[0] != body_hash:
+            self.drop_orphan(old[0])
+        self.evict()
+        self.conn.commit()
+
+    def drop_orphan(self, body_hash: str) -> int:
+        """Delete a body once no URL points at it any more and return the bytes freed"""
+        if self.conn.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone():
+            return 0
+        row = self.conn.execute("SELECT size FROM objects WHERE body_hash = ?", (body_hash,)).fetchone()
+        self.conn.execute("DELETE FROM objects WHERE body_hash = ?", (body_hash,))
+        try:
+            os.remove(self.object_path(body_hash))
+        except FileNotFoundError:
+            pass
+        return row[0] if row else 0
+
+    def total_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            rows = self.conn.execute("SELECT url, body_hash FROM entries ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            for url, body_hash in rows:
+                self.conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                total -= self.drop_orphan(body_hash)
+                if total <= self.max_bytes:
+                    break
+
+    def begin(self, url: str):
+        """Return (fresh cached response or None, entry, request headers)"""
+        row = self.lookup(url)
+        if row and time.time() - row[3] < self.ttl:
+            return self.cached(url, row), row, {}
+        return None, row, self.request_headers(row)
+
+    def finish(self, url: str, row, status: int, body: bytes, headers) -> CachedResponse:
+        if status == 304 and row:
+            return self.cached(url, row, revalidated=True)
+        self.misses += 1
+        if status == 200:
+            self.store(url, body, headers)
+        return CachedResponse(status, body, headers)
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> CachedResponse:
+        response, row, request_headers = self.begin(url)
+        if response:
+            return response
+        async with session.get(url, headers=request_headers) as http_response:
+            body = await http_response.read()
+            return self.finish(url, row, http_response.status, body, http_response.headers)
+
+    def fetch_sync(self, session, url: str) -> CachedResponse:
+        """Same as fetch() for a blocking requests.Session"""
+        response, row, request_headers = self.begin(url)
+        if response:
+            return response
+        http_response = session.get(url, headers=request_headers)
+        return self.finish(url, row, http_response.status_code, http_response.content, http_response.headers)
+
+    def stats(self) -> str:
+        return (f"cache hits: {self.hits}, revalidated: {self.revalidated}, misses: {self.misses}, "
+                f"size: {self.total_bytes() / 1024**2:.1f} MB")
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str, cache: ResponseCache = None) -> CachedResponse:
+    """GET a page through the cache, or straight from the network when cache is None"""
+    if cache:
+        return await cache.fetch(session, url)
+    async with session.get(url) as response:
+        return CachedResponse(response.status, await response.read(), response.headers)
+
+
+def fetch_page_sync(session, url: str, cache: ResponseCache = None) -> CachedResponse:
+    if cache:
+        return cache.fetch_sync(session, url)
+    response = session.get(url)
+    return CachedResponse(response.status_code, response.content, response.headers)
@@ -0,0 +1,67 @@
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Dict, Optional
+
+
+class LLMCache:
+    """SQLite store of parsed LLM results keyed by a hash of model, prompt template and input text"""
+
+    def __init__(self, path: str = "llm_cache.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_prompt_version ON results (prompt_version);
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt_template: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, prompt_template, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, prompt_version: str, result: Dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (key, model, prompt_version, json.dumps(result), time.time())
+        )
+        self.conn.commit()
+
+    def invalidate(self, prompt_version: str = None, keep_version: str = None) -> int:
+        """Delete results of one prompt version, or of every version except keep_version; returns rows deleted"""
+        if prompt_version is not None:
+            cursor = self.conn.execute("DELETE FROM results WHERE prompt_version = ?", (prompt_version,))
+        elif keep_version is not None:
+            cursor = self.conn.execute("DELETE FROM results WHERE prompt_version != ?", (keep_version,))
+        else:
+            cursor = self.conn.execute("DELETE FROM results")
+        self.conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> str:
+        size = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return f"LLM cache hits: {self.hits}, misses: {self.misses}, entries: {size}"
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,57 @@
+import json
+import time
+from typing import List
+
+
+class LLMCallLog:
+    """JSONL sink with one line per completion request (tokens, latency, outcome) and running totals"""
+
+    def __init__(self, path: str = None):
+        self.file = open(path, "a", encoding="utf-8") if path else None
+        self.calls = 0
+        self.errors = 0
+        self.sequences = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = []
+
+    def record(self, sequence_ids: List[str], prompt_tokens: int = 0, completion_tokens: int = 0,
+               latency: float = None, status: str = "ok", finish_reason: str = None, **fields):
+        self.calls += 1
+        self.sequences += len(sequence_ids)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if status != "ok":
+            self.errors += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        if self.file:
+            self.file.write(json.dumps({
+                "time": time.time(),
+                "sequence_ids": sequence_ids,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "latency": None if latency is None else round(latency, 4),
+                "status": status,
+                "finish_reason": finish_reason,
+                **fields
+            }) + "\n")
+            self.file.flush()
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def summary(self) -> str:
+        per_sequence = (self.prompt_tokens + self.completion_tokens) / max(self.sequences, 1)
+        return (f"LLM calls: {self.calls} ({self.errors} failed) for {self.sequences} sequences, "
+                f"{self.prompt_tokens} prompt + {self.completion_tokens} completion tokens "
+                f"({per_sequence:.0f} per sequence), latency p50 {self.percentile(0.5):.2f}s "
+                f"p95 {self.percentile(0.95):.2f}s")
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -1,6 +1,13 @@
 import os
-from neo4j import GraphDatabase
+import logging
+import argparse
 from dotenv import load_dotenv
+from metrics import Metrics
+from profiling import Profiler
+from oeis_dump import iter_dump_records
+# The loader and its bulk UNWIND writes are shared with load_oeis_recursive.py
+from load_oeis_recursive import OEISLoader, load_to_neo4j, parse_seq_lines
+from seq_manifest import SeqManifest
 
 # Load environment variables
 load_dotenv()
@@ -10,120 +17,103 @@ uri = "neo4j://localhost:7687"
 username = "neo4j"
 password = os.getenv("NEO4J_PASSWORD")
 
-class OEISLoader:
-
-    def __init__(self, uri, username, password):
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
-
-    def close(self):
-        self.driver.close()
-
-    def create_sequence_node(self, seq_id, description):
-        with self.driver.session() as session:
-            session.run(
-                "MERGE (s:Sequence {id: $seq_id, description: $description})",
-                seq_id=seq_id, description=description
-            )
-
-    def create_author_node(self, author_name):
-        with self.driver.session() as session:
-            session.run(
-                "MERGE (a:Author {name: $author_name})",
-                author_name=author_name
-            )
-
-    def create_reference_node(self, ref):
-        with self.driver.session() as session:
-            session.run(
-                "MERGE (r:Reference {citation: $ref})",
-                ref=ref
-            )
-
-    def create_relationships(self, seq_id, author_name=None, ref=None):
-        with self.driver.session() as session:
-            if author_name and ref:
-                session.run(
-                    """
-                    MATCH (s:Sequence {id: $seq_id}), (a:Author {name: $author_name}), (r:Reference {citation: $ref})
-                    MERGE (s)-[:HAS_AUTHOR]->(a)
-                    MERGE (s)-[:HAS_REFERENCE]->(r)
-                    MERGE (r)-[:AUTHORED_BY]->(a)
-                    """,
-                    seq_id=seq_id, author_name=author_name, ref=ref
-                )
-            elif author_name:
-                session.run(
-                    """
-                    MATCH (s:Sequence {id: $seq_id}), (a:Author {name: $author_name})
-                    MERGE (s)-[:HAS_AUTHOR]->(a)
-                    """,
-                    seq_id=seq_id, author_name=author_name
-                )
-            elif ref:
-                session.run(
-                    """
-                    MATCH (s:Sequence {id: $seq_id}), (r:Reference {citation: $ref})
-                    MERGE (s)-[:HAS_REFERENCE]->(r)
-                    """,
-                    seq_id=seq_id, ref=ref
-                )
-
-# Parse the .seq file
+# Parse the .seq file; the same record parser as the --dump path, so both create the same nodes
 def parse_seq_file(file_path):
-    sequence_data = {"id": None, "description": None, "authors": [], "references": []}
     # print(file_path)
     with open(file_path, 'r', encoding='utf8') as file:
-        for line in file:
-            if line.startswith('%I'):
-                sequence_data["id"] = line.split()[1].strip()
-            elif line.startswith('%N'):
-                sequence_data["description"] = line.strip()[3:]
-            elif line.startswith('%A'):
-                author = line.split(" ")[2:]
-                sequence_data["authors"].append(author)
-            elif line.startswith('%D'):
-                sequence_data["references"].append(line.strip()[3:])
-    
-    return sequence_data
-
-# Load a single sequence into Neo4j
-def load_to_neo4j(seq_data):
-    oeis_loader = OEISLoader(uri, username, password)
-    
-    oeis_loader.create_sequence_node(seq_data["id"], seq_data["description"])
-    
-    for author in seq_data["authors"]:
-        oeis_loader.create_author_node(author)
-        oeis_loader.create_relationships(seq_data["id"], author, None)
-
-    for ref in seq_data["references"]:
-        oeis_loader.create_reference_node(ref)
-        oeis_loader.create_relationships(seq_data["id"], None, ref)
-    
-    oeis_loader.close()
+        return parse_seq_lines(file)
 
 # Process all .seq files in the folder
-def process_all_seq_files(folder_path):
-    oeis_loader = OEISLoader(uri, username, password)
-    
+def process_all_seq_files(folder_path, oeis_loader):
     for file_name in os.listdir(folder_path):
         if file_name.endswith(".seq"):
             file_path = os.path.join(folder_path, file_name)
-            seq_data = parse_seq_file(file_path)
-            load_to_neo4j(seq_data)
+            with oeis_loader.metrics.time("parse_seconds", "Parsing one .seq file"):
+                seq_data = parse_seq_file(file_path)
+            load_to_neo4j(seq_data, oeis_loader)
 
-    oeis_loader.close()
+# Process only new or changed .seq files, marking them in the manifest once written to Neo4j
+def process_changed_seq_files(folder_path, oeis_loader, manifest):
+    for file_name in os.listdir(folder_path):
+        if file_name.endswith(".seq"):
+            file_path = os.path.join(folder_path, file_name)
+            changed, content_hash = manifest.check(file_path)
+            if not changed:
+                continue
+            with oeis_loader.metrics.time("parse_seconds", "Parsing one .seq file"):
+                seq_data = parse_seq_file(file_path)
+            load_to_neo4j(seq_data, oeis_loader)
+            manifest.stage(file_path, content_hash)
+            if not oeis_loader.pending:
+                # Nothing is buffered, so every staged file has been written
+                manifest.mark_loaded()
 
 # Specify the folder containing .seq files
 
 # folder_path = "seq/A000/"
-# process_all_seq_files(folder_path)
-
-for i in range(0, 377):
-    folder_name = 'seq/' + 'A' + '{num:03d}'.format(num=i) + '/'
-    process_all_seq_files(folder_name)
-    print(folder_name)
+# process_all_seq_files(folder_path, oeis_loader)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the OEIS seq/A000-A376 folders into Neo4j")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="sequences per UNWIND flush (0 = one session per MERGE)")
+    parser.add_argument("--writers", type=int, default=1,
+                        help="concurrent Neo4j write transactions per flush (needs --batch-size)")
+    parser.add_argument("--dump", help="read a single concatenated dump file instead of seq/A000-A376")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only parse and write .seq files that changed since the last load")
+    parser.add_argument("--manifest", default="seq_manifest.db",
+                        help="SQLite manifest of file hashes used by --incremental")
+    parser.add_argument("--metrics-file", help="Prometheus text file (or .jsonl) receiving the metrics every interval")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between progress reports")
+    parser.add_argument("--profile", nargs="?", const="profile", metavar="PREFIX",
+                        help="sample the run; writes PREFIX.collapsed (flame graph stacks) and PREFIX.txt (hot spots)")
+    args = parser.parse_args()
+    if args.incremental and args.dump:
+        # The manifest tracks .seq file hashes, which a dump does not have
+        parser.error("--incremental works on the seq/ folders and cannot be combined with --dump")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    metrics = Metrics(args.metrics_file, interval=args.metrics_interval)
+    oeis_loader = OEISLoader(uri, username, password, batch_size=args.batch_size, writers=args.writers,
+                             metrics=metrics)
+    manifest = SeqManifest(args.manifest) if args.incremental else None
+    folders_done = metrics.counter("folders_done", "seq/ folders parsed and handed to the writer")
+    if args.dump:
+        metrics.track_progress(None, oeis_loader.handled, "sequences")
+    else:
+        metrics.track_progress(377, lambda: folders_done.value, "folders")
+    profiler = Profiler(args.profile) if args.profile else None
+    metrics.start()
+    if profiler:
+        profiler.start()
+    try:
+        if args.dump:
+            for seq_data in iter_dump_records(args.dump):
+                load_to_neo4j(seq_data, oeis_loader)
+            print(args.dump)
+        else:
+            for i in range(0, 377):
+                folder_name = 'seq/' + 'A' + '{num:03d}'.format(num=i) + '/'
+                if manifest:
+                    process_changed_seq_files(folder_name, oeis_loader, manifest)
+                else:
+                    process_all_seq_files(folder_name, oeis_loader)
+                folders_done.inc()
+                print(folder_name)
+        if manifest:
+            oeis_loader.flush()
+            manifest.mark_loaded()
+            print(f"Loaded {manifest.changed_count} new or changed sequences, "
+                  f"skipped {manifest.unchanged_count} unchanged")
+    finally:
+        oeis_loader.close()
+        metrics.stop()
+        if profiler:
+            profiler.stop()
+        if manifest:
+            manifest.close()
 
 
 # sudo docker ps
-# sudo docker run -p7474:7474 -p7687:7687 -d --env NEO4J_AUTH=neo4j/test1234 neo4j:latest
\ No newline at end of file
+# sudo docker run -p7474:7474 -p7687:7687 -d --env NEO4J_AUTH=neo4j/test1234 neo4j:latest
@@ -1,6 +1,17 @@
 import os
+import re
+import logging
+import argparse
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
+from oeis_schema import ensure_schema
+from parallel_writer import ParallelWriter, partition_rows, busiest_key
+from metrics import Metrics
+from profiling import Profiler
 
 # Load environment variables
 load_dotenv()
@@ -10,17 +21,34 @@ uri = "neo4j://localhost:7687"
 username = "neo4j"
 password = os.getenv("NEO4J_PASSWORD")
 
+# Loader used by all three load_oeis_*.py scripts: per-sequence MERGEs, or buffered UNWIND flushes with batch_size > 0
 class OEISLoader:
-    def __init__(self, uri, username, password):
+    def __init__(self, uri, username, password, batch_size=0, writers=1, metrics=None):
         self.driver = GraphDatabase.driver(uri, auth=(username, password))
+        # batch_size > 0 switches to bulk mode: parsed sequences are buffered
+        # and written with a few UNWIND queries per flush
+        self.batch_size = batch_size
+        self.pending = []
+        # writers > 1 splits each flush into partitions written by concurrent transactions
+        self.writers = writers
+        self.writer = ParallelWriter(self.driver, writers) if writers > 1 else None
+        # Parse and write latencies, sequences loaded and progress
+        self.metrics = metrics or Metrics()
+        self.loaded = self.metrics.counter("sequences_loaded", "Sequences written to Neo4j")
+        ensure_schema(self.driver)
 
     def close(self):
-        self.driver.close()
+        try:
+            self.flush()
+        finally:
+            if self.writer:
+                self.writer.close()
+            self.driver.close()
 
     def create_sequence_node(self, seq_id, description):
         with self.driver.session() as session:
             session.run(
-                "MERGE (s:Sequence {id: $seq_id, description: $description})",
+                "MERGE (s:Sequence {id: $seq_id}) SET s.description = $description",
                 seq_id=seq_id, description=description
             )
 
@@ -67,49 +95,264 @@ class OEISLoader:
                     seq_id=seq_id, ref=ref
                 )
 
+    def handled(self):
+        """Sequences handed to the loader so far, written or still buffered"""
+        return self.loaded.value + len(self.pending)
+
+    def add_sequence(self, seq_data):
+        """Buffer a parsed sequence, flushing once batch_size sequences are pending"""
+        self.pending.append(seq_data)
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Write all pending sequences and return how many were written"""
+        if not self.pending:
+            return 0
+        sequences, authors, references = build_batch_rows(self.pending)
+        with self.metrics.time("db_batch_seconds", "Writing one flush of sequences"):
+            if self.writer:
+                self.write_partitioned(sequences, authors, references)
+            else:
+                # A single transaction for the whole flush
+                with self.driver.session() as session:
+                    session.execute_write(self._write_batch, sequences, authors, references)
+        flushed = len(self.pending)
+        self.pending = []
+        self.loaded.inc(flushed)
+        return flushed
+
+    def write_partitioned(self, sequences, authors, references):
+        """Write one flush with concurrent transactions, one phase per query.
+        Sequence nodes are disjoint between partitions. Relationship rows are partitioned by
+        the endpoint with more edges in the flush (usually the author or citation), which is then
+        locked by one transaction only; the other endpoint may be shared between partitions and
+        its lock conflicts are left to execute_write's deadlock retries."""
+        # Sequences first: the author and reference queries MATCH them
+        self.writer.write_all(
+            (self._write_rows, BATCH_SEQUENCE_QUERY, part)
+            for part in partition_rows(sequences, "id", self.writers)
+        )
+        # Authors and references one after the other, so a sequence is not locked by an
+        # author transaction and a reference transaction at the same time
+        for query, rows, key in ((BATCH_AUTHOR_QUERY, authors, "name"), (BATCH_REFERENCE_QUERY, references, "citation")):
+            if rows:
+                self.writer.write_all(
+                    (self._write_rows, query, part)
+                    for part in partition_rows(rows, busiest_key(rows, ("seq_id", key)), self.writers)
+                )
+
+    @staticmethod
+    def _write_rows(tx, query, rows):
+        tx.run(query, rows=rows).consume()
+
+    @staticmethod
+    def _write_batch(tx, sequences, authors, references):
+        tx.run(BATCH_SEQUENCE_QUERY, rows=sequences)
+        if authors:
+            tx.run(BATCH_AUTHOR_QUERY, rows=authors)
+        if references:
+            tx.run(BATCH_REFERENCE_QUERY, rows=references)
+
+# UNWIND queries used by the bulk loader mode
+BATCH_SEQUENCE_QUERY = """
+UNWIND $rows AS row
+MERGE (s:Sequence {id: row.id})
+SET s.description = row.description
+"""
+
+BATCH_AUTHOR_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Sequence {id: row.seq_id})
+MERGE (a:Author {name: row.name})
+MERGE (s)-[:HAS_AUTHOR]->(a)
+"""
+
+BATCH_REFERENCE_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Sequence {id: row.seq_id})
+MERGE (r:Reference {citation: row.citation})
+MERGE (s)-[:HAS_REFERENCE]->(r)
+"""
+
+# Flatten parsed sequences into UNWIND parameter rows
+def build_batch_rows(seq_batch):
+    sequences, authors, references = [], [], []
+    for seq_data in seq_batch:
+        seq_id = seq_data["id"]
+        if not seq_id:
+            continue
+        sequences.append({"id": seq_id, "description": seq_data["description"] or ""})
+        for author in seq_data["authors"]:
+            authors.append({"seq_id": seq_id, "name": author})
+        for ref in seq_data["references"]:
+            references.append({"seq_id": seq_id, "citation": ref})
+    return sequences, authors, references
+
+# Sequence IDs mentioned on a %Y (cross-references) line
+SEQ_ID_PATTERN = re.compile(r"\bA\d{6}\b")
+
+# Parse the lines of one sequence in internal format. Shared by every loader, the dump reader
+# and the exporter, so a corpus creates the same nodes whichever way it is read
+def parse_seq_lines(lines):
+    sequence_data = {"id": None, "description": None, "authors": [], "references": [], "crossrefs": []}
+    for line in lines:
+        parts = line.split()
+        if line.startswith('%I'):
+            # A bare %I or %Y line has nothing to read; skip it
+            if len(parts) > 1:
+                sequence_data["id"] = parts[1].strip()
+        elif line.startswith('%N'):
+            sequence_data["description"] = line.strip()[3:]
+        elif line.startswith('%A'):
+            author = " ".join(line.split(" ")[2:]).strip()
+            sequence_data["authors"].append(author)
+        elif line.startswith('%D'):
+            sequence_data["references"].append(line.strip()[3:])
+        elif line.startswith('%Y') and len(parts) > 1:
+            for ref in SEQ_ID_PATTERN.findall(line, 3 + len(parts[1])):
+                if ref != sequence_data["id"] and ref not in sequence_data["crossrefs"]:
+                    sequence_data["crossrefs"].append(ref)
+    
+    return sequence_data
+
 # Parse the .seq file
 def parse_seq_file(file_path):
-    sequence_data = {"id": None, "description": None, "authors": [], "references": []}
     print(file_path)
     with open(file_path, 'r', encoding='utf8') as file:
-        for line in file:
-            if line.startswith('%I'):
-                sequence_data["id"] = line.split()[1].strip()
-            elif line.startswith('%N'):
-                sequence_data["description"] = line.strip()[3:]
-            elif line.startswith('%A'):
-                author = " ".join(line.split(" ")[2:]).strip()
-                sequence_data["authors"].append(author)
-            elif line.startswith('%D'):
-                sequence_data["references"].append(line.strip()[3:])
-    
-    return sequence_data
+        return parse_seq_lines(file)
 
 # Load a single sequence into Neo4j
 def load_to_neo4j(seq_data, oeis_loader):
-    oeis_loader.create_sequence_node(seq_data["id"], seq_data["description"])
-    
-    for author in seq_data["authors"]:
-        oeis_loader.create_author_node(author)
-        oeis_loader.create_relationships(seq_data["id"], author, None)
+    if oeis_loader.batch_size:
+        oeis_loader.add_sequence(seq_data)
+        return
+
+    with oeis_loader.metrics.time("db_sequence_seconds", "Writing one sequence with separate MERGEs"):
+        oeis_loader.create_sequence_node(seq_data["id"], seq_data["description"])
+        
+        for author in seq_data["authors"]:
+            oeis_loader.create_author_node(author)
+            oeis_loader.create_relationships(seq_data["id"], author, None)
+
+        for ref in seq_data["references"]:
+            oeis_loader.create_reference_node(ref)
+            oeis_loader.create_relationships(seq_data["id"], None, ref)
+    oeis_loader.loaded.inc()
+
+# Parse every .seq file in one folder into compact records (runs in a worker process)
+def parse_folder(folder_path):
+    records = []
+    for file_name in sorted(os.listdir(folder_path)):
+        if file_name.endswith(".seq"):
+            with open(os.path.join(folder_path, file_name), 'r', encoding='utf8') as file:
+                seq_data = parse_seq_lines(file)
+            records.append((seq_data["id"], seq_data["description"],
+                            tuple(seq_data["authors"]), tuple(seq_data["references"])))
+    return folder_path, records
 
-    for ref in seq_data["references"]:
-        oeis_loader.create_reference_node(ref)
-        oeis_loader.create_relationships(seq_data["id"], None, ref)
+# Turn a compact record from parse_folder back into the parse_seq_file dict
+def expand_record(record):
+    seq_id, description, authors, references = record
+    return {"id": seq_id, "description": description, "authors": list(authors), "references": list(references)}
+
+# Folders under main_folder_path that directly contain .seq files (A000 ... A376)
+def find_seq_folders(main_folder_path):
+    return sorted(
+        root for root, dirs, files in os.walk(main_folder_path)
+        if any(file_name.endswith(".seq") for file_name in files)
+    )
+
+# Fan folders out to a process pool, keeping at most 2 * workers folders in flight
+def iter_parsed_folders(folders, workers, ordered=True):
+    folders = iter(folders)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque(executor.submit(parse_folder, folder) for folder in islice(folders, 2 * workers))
+        while in_flight:
+            if ordered:
+                done = [in_flight.popleft()]
+            else:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                done = [future for future in in_flight if future in finished]
+                for future in done:
+                    in_flight.remove(future)
+            for future in done:
+                yield future.result()
+                folder = next(folders, None)
+                if folder is not None:
+                    in_flight.append(executor.submit(parse_folder, folder))
 
 # Process all .seq files in all subfolders
-def process_all_seq_files(main_folder_path):
-    oeis_loader = OEISLoader(uri, username, password)
+def process_all_seq_files(main_folder_path, batch_size=0, workers=1, ordered=True, writers=1, metrics=None):
+    oeis_loader = OEISLoader(uri, username, password, batch_size=batch_size, writers=writers, metrics=metrics)
+    metrics = oeis_loader.metrics
     
-    for root, dirs, files in os.walk(main_folder_path):
-        for file_name in files:
-            if file_name.endswith(".seq"):
-                file_path = os.path.join(root, file_name)
-                seq_data = parse_seq_file(file_path)
-                load_to_neo4j(seq_data, oeis_loader)
-
-    oeis_loader.close()
-
-# Specify the main folder containing all subfolders with .seq files
-main_folder_path = "seq/"
-process_all_seq_files(main_folder_path)
+    try:
+        if workers > 1:
+            # Parsing runs in the pool; this process is the single writer stage
+            folders = find_seq_folders(main_folder_path)
+            folders_done = metrics.counter("folders_done", "Folders parsed and handed to the writer")
+            metrics.track_progress(len(folders), lambda: folders_done.value, "folders")
+            metrics.start()
+            for folder_path, records in iter_parsed_folders(folders, workers, ordered):
+                for record in records:
+                    load_to_neo4j(expand_record(record), oeis_loader)
+                folders_done.inc()
+                print(folder_path)
+        else:
+            metrics.track_progress(None, oeis_loader.handled, "sequences")
+            metrics.start()
+            for root, dirs, files in os.walk(main_folder_path):
+                for file_name in files:
+                    if file_name.endswith(".seq"):
+                        file_path = os.path.join(root, file_name)
+                        with metrics.time("parse_seconds", "Parsing one .seq file"):
+                            seq_data = parse_seq_file(file_path)
+                        load_to_neo4j(seq_data, oeis_loader)
+    finally:
+        oeis_loader.close()
+        metrics.stop()
+
+# Load every sequence from a single concatenated internal-format dump (see oeis_dump.py)
+def process_dump_file(dump_path, batch_size=0, writers=1, metrics=None):
+    from oeis_dump import iter_dump_records
+
+    oeis_loader = OEISLoader(uri, username, password, batch_size=batch_size, writers=writers, metrics=metrics)
+    oeis_loader.metrics.track_progress(None, oeis_loader.handled, "sequences")
+    oeis_loader.metrics.start()
+    try:
+        for seq_data in iter_dump_records(dump_path):
+            load_to_neo4j(seq_data, oeis_loader)
+    finally:
+        oeis_loader.close()
+        oeis_loader.metrics.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recursively load every .seq file under a folder into Neo4j")
+    parser.add_argument("main_folder_path", nargs="?", default="seq/",
+                        help="main folder containing all subfolders with .seq files")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="sequences per UNWIND flush (0 = one session per MERGE)")
+    parser.add_argument("--writers", type=int, default=1,
+                        help="concurrent Neo4j write transactions per flush (needs --batch-size)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parser processes; folders are parsed in parallel when > 1")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write folders as soon as they are parsed instead of in A000..A376 order")
+    parser.add_argument("--dump", help="read a single concatenated dump file instead of the folder tree")
+    parser.add_argument("--metrics-file", help="Prometheus text file (or .jsonl) receiving the metrics every interval")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between progress reports")
+    parser.add_argument("--profile", nargs="?", const="profile", metavar="PREFIX",
+                        help="sample the run; writes PREFIX.collapsed (flame graph stacks) and PREFIX.txt (hot spots)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    metrics = Metrics(args.metrics_file, interval=args.metrics_interval)
+    with Profiler(args.profile) if args.profile else nullcontext():
+        if args.dump:
+            process_dump_file(args.dump, batch_size=args.batch_size, writers=args.writers, metrics=metrics)
+        else:
+            process_all_seq_files(args.main_folder_path, batch_size=args.batch_size,
+                                  workers=args.workers, ordered=not args.unordered, writers=args.writers,
+                                  metrics=metrics)
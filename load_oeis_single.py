@@ -1,6 +1,10 @@
 import os
-from neo4j import GraphDatabase
+import logging
+import argparse
 from dotenv import load_dotenv
+# The loader and its bulk UNWIND writes are shared with load_oeis_recursive.py
+from load_oeis_recursive import OEISLoader, load_to_neo4j, parse_seq_lines
+from metrics import Metrics
 
 # Load environment variables
 load_dotenv()
@@ -10,110 +14,42 @@ uri = "neo4j://localhost:7687"
 username = "neo4j"
 password = os.getenv("NEO4J_PASSWORD")
 
-class OEISLoader:
-
-    def __init__(self, uri, username, password):
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
-
-    def close(self):
-        self.driver.close()
-
-    def create_sequence_node(self, seq_id, description):
-        with self.driver.session() as session:
-            session.run(
-                "MERGE (s:Sequence {id: $seq_id, description: $description})",
-                seq_id=seq_id, description=description
-            )
-
-    def create_author_node(self, author_name):
-        with self.driver.session() as session:
-            session.run(
-                "MERGE (a:Author {name: $author_name})",
-                author_name=author_name
-            )
-
-    def create_reference_node(self, ref):
-        with self.driver.session() as session:
-            session.run(
-                "MERGE (r:Reference {citation: $ref})",
-                ref=ref
-            )
-
-    def create_relationships(self, seq_id, author_name=None, ref=None):
-        with self.driver.session() as session:
-            if author_name and ref:
-                session.run(
-                    """
-                    MATCH (s:Sequence {id: $seq_id}), (a:Author {name: $author_name}), (r:Reference {citation: $ref})
-                    MERGE (s)-[:HAS_AUTHOR]->(a)
-                    MERGE (s)-[:HAS_REFERENCE]->(r)
-                    MERGE (r)-[:AUTHORED_BY]->(a)
-                    """,
-                    seq_id=seq_id, author_name=author_name, ref=ref
-                )
-            elif author_name:
-                session.run(
-                    """
-                    MATCH (s:Sequence {id: $seq_id}), (a:Author {name: $author_name})
-                    MERGE (s)-[:HAS_AUTHOR]->(a)
-                    """,
-                    seq_id=seq_id, author_name=author_name
-                )
-            elif ref:
-                session.run(
-                    """
-                    MATCH (s:Sequence {id: $seq_id}), (r:Reference {citation: $ref})
-                    MERGE (s)-[:HAS_REFERENCE]->(r)
-                    """,
-                    seq_id=seq_id, ref=ref
-                )
-
-# Parse the .seq file
+# Parse the .seq file with the record parser shared by all loaders
 def parse_seq_file(file_path):
-    sequence_data = {"id": None, "description": None, "authors": [], "references": []}
     print(file_path)
     with open(file_path, 'r', encoding='utf8') as file:
-        for line in file:
-            if line.startswith('%I'):
-                sequence_data["id"] = line.split()[1].strip()
-            elif line.startswith('%N'):
-                sequence_data["description"] = line.strip()[3:]
-            elif line.startswith('%A'):
-                author = line.split(" ")[2:]
-                sequence_data["authors"].append(author)
-            elif line.startswith('%D'):
-                sequence_data["references"].append(line.strip()[3:])
-    
-    return sequence_data
-
-# Load a single sequence into Neo4j
-def load_to_neo4j(seq_data):
-    oeis_loader = OEISLoader(uri, username, password)
-    
-    oeis_loader.create_sequence_node(seq_data["id"], seq_data["description"])
-    
-    for author in seq_data["authors"]:
-        oeis_loader.create_author_node(author)
-        oeis_loader.create_relationships(seq_data["id"], author, None)
-
-    for ref in seq_data["references"]:
-        oeis_loader.create_reference_node(ref)
-        oeis_loader.create_relationships(seq_data["id"], None, ref)
-    
-    oeis_loader.close()
+        return parse_seq_lines(file)
 
 # Process all .seq files in the folder
-def process_all_seq_files(folder_path):
-    oeis_loader = OEISLoader(uri, username, password)
+def process_all_seq_files(folder_path, batch_size=0, writers=1, metrics=None):
+    oeis_loader = OEISLoader(uri, username, password, batch_size=batch_size, writers=writers, metrics=metrics)
+    metrics = oeis_loader.metrics
     
-    for file_name in os.listdir(folder_path):
-        if file_name.endswith(".seq"):
+    try:
+        file_names = [file_name for file_name in os.listdir(folder_path) if file_name.endswith(".seq")]
+        metrics.track_progress(len(file_names), oeis_loader.handled, "sequences")
+        metrics.start()
+        for file_name in file_names:
             file_path = os.path.join(folder_path, file_name)
-            seq_data = parse_seq_file(file_path)
-            load_to_neo4j(seq_data)
-
-    oeis_loader.close()
-
-# Specify the folder containing .seq files
-folder_path = "seq/A000/"
-process_all_seq_files(folder_path)
+            with metrics.time("parse_seconds", "Parsing one .seq file"):
+                seq_data = parse_seq_file(file_path)
+            load_to_neo4j(seq_data, oeis_loader)
+    finally:
+        oeis_loader.close()
+        metrics.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a single OEIS folder into Neo4j for testing")
+    # Specify the folder containing .seq files
+    parser.add_argument("folder_path", nargs="?", default="seq/A000/")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="sequences per UNWIND flush (0 = one session per MERGE)")
+    parser.add_argument("--writers", type=int, default=1,
+                        help="concurrent Neo4j write transactions per flush (needs --batch-size)")
+    parser.add_argument("--metrics-file", help="Prometheus text file (or .jsonl) receiving the metrics every interval")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between progress reports")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    process_all_seq_files(args.folder_path, batch_size=args.batch_size, writers=args.writers,
+                          metrics=Metrics(args.metrics_file, interval=args.metrics_interval))
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+# Latency buckets in seconds, from a cached page parse up to a slow Neo4j batch
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self.lock:
+            self.value += amount
+
+
+class Gauge:
+    """Current value of something, either set explicitly or read from a function at export time"""
+
+    def __init__(self, name: str, help_text: str = "", function: Callable = None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        if self.function is None:
+            return self._value
+        try:
+            return self.function()
+        except Exception:
+            # The queue or limiter behind it may not exist yet, or any more
+            return 0
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str = "", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def format_duration(seconds: float) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Metrics:
+    """Counters, gauges and latency histograms shared by the pipeline stages.
+    Once started, a background thread logs a progress line with rate and ETA every
+    `interval` seconds and exports all metrics to `path`: a Prometheus text file
+    (rewritten in place, for node_exporter's textfile collector) or, for a .jsonl
+    path, one JSON snapshot appended per interval."""
+
+    def __init__(self, path: str = None, interval: float = 10.0, prefix: str = "oeis_"):
+        self.path = path
+        self.interval = interval
+        self.prefix = prefix
+        self.format = "jsonl" if path and path.endswith(".jsonl") else "prometheus"
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.total = None
+        self.done = None
+        self.unit = "items"
+        self.samples = deque(maxlen=6)  # (time, done) of the last few exports, for the current rate
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def register(self, kind, name: str, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = kind(name, *args)
+            return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self.register(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = "", function: Callable = None) -> Gauge:
+        gauge = self.register(Gauge, name, help_text)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name: str, help_text: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram, name, help_text, buckets)
+
+    def time(self, name: str, help_text: str = ""):
+        """Context manager observing the duration of the block in histogram `name`"""
+        return self.histogram(name, help_text).time()
+
+    def track_progress(self, total: int, done: Callable[[], int], unit: str = "items"):
+        """done() returns the work finished so far; total may be None when unknown (no ETA)"""
+        self.total = total
+        self.done = done
+        self.unit = unit
+        self.start_time = time.monotonic()
+        self.samples.clear()
+        self.samples.append((self.start_time, done()))
+
+    def progress(self) -> Dict:
+        now = time.monotonic()
+        done = self.done() if self.done else 0
+        self.samples.append((now, done))
+        # Rate over the last few intervals, so a burst of skipped work at the start does not skew it
+        first_time, first_done = self.samples[0]
+        rate = (done - first_done) / (now - first_time) if now > first_time else 0.0
+        eta = None
+        if self.total is not None and done >= self.total:
+            eta = 0.0
+        elif self.total is not None and rate > 0:
+            eta = (self.total - done) / rate
+        return {"done": done, "total": self.total, "unit": self.unit, "rate": rate,
+                "elapsed": now - self.start_time, "eta": eta}
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        snapshot = {"time": time.time(), "progress": self.progress(), "counters": {}, "gauges": {}, "histograms": {}}
+        for metric in metrics:
+            if isinstance(metric, Counter):
+                snapshot["counters"][metric.name] = metric.value
+            elif isinstance(metric, Gauge):
+                snapshot["gauges"][metric.name] = metric.value
+            else:
+                snapshot["histograms"][metric.name] = {
+                    "count": metric.count, "sum": round(metric.sum, 6),
+                    "p50": metric.percentile(0.5), "p99": metric.percentile(0.99)
+                }
+        return snapshot
+
+    def prometheus_text(self, snapshot: Dict) -> str:
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            name = self.prefix + metric.name
+            if isinstance(metric, Counter):
+                # Prometheus convention for counter names
+                name += "_total"
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            if isinstance(metric, Counter):
+                lines += [f"# TYPE {name} counter", f"{name} {metric.value}"]
+            elif isinstance(metric, Gauge):
+                lines += [f"# TYPE {name} gauge", f"{name} {snapshot['gauges'][metric.name]}"]
+            else:
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), metric.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{le="{le}"}} {cumulative}')
+                lines += [f"{name}_sum {metric.sum}", f"{name}_count {metric.count}"]
+        progress = snapshot["progress"]
+        lines += [f"# TYPE {self.prefix}progress_done gauge", f"{self.prefix}progress_done {progress['done']}"]
+        if progress["total"] is not None:
+            lines += [f"# TYPE {self.prefix}progress_total gauge", f"{self.prefix}progress_total {progress['total']}"]
+        if progress["eta"] is not None:
+            lines += [f"# TYPE {self.prefix}eta_seconds gauge", f"{self.prefix}eta_seconds {progress['eta']:.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def summary(self, snapshot: Dict) -> str:
+        progress = snapshot["progress"]
+        total = f"/{progress['total']}" if progress["total"] is not None else ""
+        parts = [f"{progress['done']}{total} {progress['unit']}, {progress['rate']:.1f}/s, "
+                 f"elapsed {format_duration(progress['elapsed'])}, ETA {format_duration(progress['eta'])}"]
+        parts += [f"{name} {value}" for name, value in snapshot["gauges"].items()]
+        parts += [f"{name} p50 {values['p50']:g}s p99 {values['p99']:g}s"
+                  for name, values in snapshot["histograms"].items() if values["count"]]
+        return " | ".join(parts)
+
+    def export(self):
+        snapshot = self.snapshot()
+        logging.info(f"Progress: {self.summary(snapshot)}")
+        if not self.path:
+            return
+        if self.format == "jsonl":
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(snapshot) + "\n")
+        else:
+            # Write and rename, so a scraper never reads a half-written file
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(self.prometheus_text(snapshot))
+            os.replace(temp_path, self.path)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.export()
+            except Exception as e:
+                logging.error(f"Metrics export failed: {str(e)}")
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name="metrics-exporter", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the exporter thread and export one last time"""
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+            self.export()
@@ -1,189 +1,364 @@
-from bs4 import BeautifulSoup
 import aiohttp
 import asyncio
 from neo4j import GraphDatabase
 import re
 import time
-from typing import List, Dict
-from collections import deque
+from typing import List, Dict, Optional
 import logging
+from collections import defaultdict
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 import os
+import argparse
 from dotenv import load_dotenv
+from http_cache import ResponseCache, fetch_page, OEIS_BASE_URL
+from rate_control import AdaptiveLimiter
+from oeis_html import parse_sequence_links, parse_sequence_links_fast
+from checkpoint import Checkpoint
+from oeis_schema import ensure_schema
+from parallel_writer import ParallelWriter, partition_rows, busiest_key
+from metrics import Metrics
+from profiling import Profiler
 
 # Load environment variables
 load_dotenv()
 
+def relationship_type(section_name: str) -> str:
+    """Section name (CROSSREFS, LINKS, FORMULA, ...) as a valid relationship type"""
+    rel_type = re.sub(r"[^0-9A-Za-z]+", "_", section_name or "").strip("_").upper()
+    if not rel_type:
+        return "RELATED"
+    if rel_type[0].isdigit():
+        rel_type = "_" + rel_type
+    return rel_type
+
 class OEISProcessor:
-    def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str):
+    def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str,
+                 cache: ResponseCache = None, base_url: str = OEIS_BASE_URL,
+                 parse_workers: int = 0, fast_parse: bool = False, checkpoint: Checkpoint = None,
+                 neo4j_writers: int = 1, metrics: Metrics = None):
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        self.sequence_queue = asyncio.Queue()
-        self.results_queue = deque()
+        self.cache = cache  # Shared on-disk page cache; None always hits the network
+        self.base_url = base_url
+        self.parse_workers = parse_workers  # Processes for HTML parsing; 0 parses inside the event loop
+        self.fast_parse = fast_parse  # Streaming tokenizer instead of a BeautifulSoup tree
+        self.parse_executor = None
+        self.checkpoint = checkpoint  # Durable record of sequences committed to Neo4j
+        self.neo4j_writers = neo4j_writers  # Concurrent write transactions per batch
+        self.neo4j_writer = None  # ParallelWriter created per run when neo4j_writers > 1
+        self.metrics = metrics or Metrics()  # Stage latencies, queue depths and progress
+        self.sequence_queue = None  # Bounded queues are created per run in process_sequences
+        self.results_queue = None
         self.processed_count = 0
-        self.batch_size = 50
-        self.last_batch_time = time.time()
+        self.skipped_count = 0
         self.sequences_processed = set()
         self.neo4j_batch_size = 1000  # Number of relationships to process in each Neo4j batch
+        self.results_queue_size = 500  # Scraped sequences waiting for the writer before scrapers block
+        self.relationships_written = 0
+        self.neo4j_time = 0.0
+        self.limiter = None  # AdaptiveLimiter created per run in process_sequences
+        self.failed_sequences = []
         
-    async def fetch_sequence(self, session: aiohttp.ClientSession, sequence_number: str) -> Dict:
-        """Fetch and parse a single OEIS sequence page"""
-        url = f"https://oeis.org/{sequence_number}"
+    async def fetch_sequence(self, session: aiohttp.ClientSession, sequence_number: str) -> Optional[List[Dict]]:
+        """Fetch and parse a single OEIS sequence page; None means the fetch failed after retries"""
+        url = f"{self.base_url}/{sequence_number}"
         try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, "html.parser")
-                    sections = soup.find_all("div", class_="section")
-                    
-                    sequence_data = []
-                    for section in sections:
-                        sectname = section.find("div", class_="sectname").get_text(strip=True)
-                        sectbody = section.find("div", class_="sectbody")
-                        if sectbody:
-                            links = sectbody.find_all("a")
-                            for link in links:
-                                sequence_data.append({
-                                    'from_id': sequence_number,
-                                    'to_id': link.get_text(strip=True),
-                                    'relationship': sectname
-                                })
-                    return sequence_data
+            with self.metrics.time("fetch_seconds", "Fetching one page, including retries"):
+                response = await self.limiter.call(lambda: fetch_page(session, url, self.cache))
+            if response.status == 200:
+                parse = parse_sequence_links_fast if self.fast_parse else parse_sequence_links
+                with self.metrics.time("parse_seconds", "Parsing the links of one page"):
+                    if self.parse_executor:
+                        # CPU-bound parsing runs in the process pool so the event loop keeps fetching
+                        loop = asyncio.get_running_loop()
+                        return await loop.run_in_executor(self.parse_executor, parse, sequence_number, response.text)
+                    return parse(sequence_number, response.text)
+            if response.status == 404:
+                return []
+            logging.error(f"Giving up on {sequence_number}: HTTP {response.status}")
         except Exception as e:
             logging.error(f"Error fetching {sequence_number}: {str(e)}")
-            return []
-        return []
+        return None
 
     async def scraper_worker(self, session: aiohttp.ClientSession):
-        """Worker to process sequences from the queue"""
+        """Worker to process sequences from the queue until it receives None"""
         while True:
             sequence_number = await self.sequence_queue.get()
+            if sequence_number is None:
+                self.sequence_queue.task_done()
+                break
             
             if sequence_number not in self.sequences_processed:
+                self.sequences_processed.add(sequence_number)
                 results = await self.fetch_sequence(session, sequence_number)
-                if results:
-                    self.results_queue.extend(results)
+                if results is None:
+                    self.failed_sequences.append(sequence_number)
+                    self.metrics.counter("sequences_failed", "Sequences whose page could not be fetched").inc()
+                else:
+                    # Blocks while the writer is behind, throttling the scrapers
+                    await self.results_queue.put((sequence_number, results))
                 
-                self.sequences_processed.add(sequence_number)
                 self.processed_count += 1
-                
-                if self.processed_count % self.batch_size == 0:
-                    current_time = time.time()
-                    batch_duration = current_time - self.last_batch_time
-                    total_duration = current_time - self.init_time
-                    print(f"Processed {self.processed_count} sequences:")
-                    # print(f"  Last {self.batch_size} sequences took: {batch_duration:.2f} seconds")
-                    # print(f"  Average time per sequence: {batch_duration/self.batch_size:.2f} seconds")
-                    print(f"  Total elapsed time: {total_duration:.2f} seconds")
-                    print("----------------------------------------")
-                    self.last_batch_time = current_time
+                self.metrics.counter("sequences_scraped", "Sequences fetched and parsed").inc()
             
             self.sequence_queue.task_done()
 
-    def neo4j_worker(self):
-        """Process results queue and write to Neo4j in batches"""
-        with self.driver.session() as session:
-            # Create indexes if they don't exist
-            session.run("CREATE INDEX sequence_id IF NOT EXISTS FOR (n:Sequence) ON (n.id)")
-            
-            batch = []
-            total_relationships = len(self.results_queue)
-            relationships_processed = 0
-            batch_count = 0
+    def write_batch(self, batch: List[Dict]) -> bool:
+        """Write one batch of relationships to Neo4j (runs in a worker thread).
+        Rows are grouped by section so each group is a single typed UNWIND ... MERGE;
+        returns False if the batch could not be written."""
+        try:
+            if self.neo4j_writer:
+                # Partition by the endpoint with more rows in this batch (usually the scraped
+                # from_id), so each of those nodes is locked by one writer; the other endpoints
+                # may be shared, and their deadlocks are retried by execute_write
+                key = busiest_key(batch, ('from_id', 'to_id'))
+                self.neo4j_writer.write_all(
+                    (self._write_groups, self.group_rows(part))
+                    for part in partition_rows(batch, key, self.neo4j_writers)
+                )
+            else:
+                with self.driver.session() as session:
+                    session.execute_write(self._write_groups, self.group_rows(batch))
+            return True
+        except Exception as e:
+            logging.error(f"Neo4j batch error: {str(e)}")
+            return False
+
+    @staticmethod
+    def group_rows(rows: List[Dict]) -> Dict[str, List[Dict]]:
+        groups = defaultdict(list)
+        for row in rows:
+            groups[relationship_type(row['relationship'])].append(row)
+        return groups
+
+    @staticmethod
+    def _write_groups(tx, groups: Dict[str, List[Dict]]):
+        for rel_type, rows in groups.items():
+            # rel_type is sanitized by relationship_type, so it is safe to splice into the query
+            query = f"""
+            UNWIND $batch as row
+            MERGE (from:Sequence {{id: row.from_id}})
+            MERGE (to:Sequence {{id: row.to_id}})
+            MERGE (from)-[:`{rel_type}`]->(to)
+            """
+            tx.run(query, batch=rows).consume()
+
+    async def neo4j_worker(self):
+        """Drain the results queue while scraping runs, flushing full batches to Neo4j"""
+        # Create constraints (and their indexes) if they don't exist
+        await asyncio.to_thread(ensure_schema, self.driver)
+        
+        batch = []
+        batch_sequences = []  # Sequences whose relationships are all in `batch`
+        
+        while True:
+            item = await self.results_queue.get()
+            if item is not None:
+                sequence_number, results = item
+                batch.extend(results)
+                batch_sequences.append(sequence_number)
             
-            while self.results_queue:
-                batch.append(self.results_queue.popleft())
+            if batch and (len(batch) >= self.neo4j_batch_size or item is None):
+                batch_start_time = time.time()
+                # The blocking driver call runs in a thread so scraping continues meanwhile
+                written = await asyncio.to_thread(self.write_batch, batch)
+                batch_duration = time.time() - batch_start_time
+                self.neo4j_time += batch_duration
+                self.metrics.histogram("db_batch_seconds", "Committing one relationship batch").observe(batch_duration)
                 
-                if len(batch) >= self.neo4j_batch_size or not self.results_queue:
-                    batch_start_time = time.time()
-                    
-                    # Process batch using UNWIND
-                    query = """
-                    UNWIND $batch as row
-                    MERGE (from:Sequence {id: row.from_id})
-                    MERGE (to:Sequence {id: row.to_id})
-                    WITH from, to, row
-                    CALL apoc.merge.relationship(from, row.relationship, {}, {}, to)
-                    YIELD rel
-                    RETURN count(*) as count
-                    """
-                    
-                    try:
-                        session.run(query, {"batch": batch})
-                        relationships_processed += len(batch)
-                        batch_count += 1
-                        
-                        batch_duration = time.time() - batch_start_time
-                        print(f"Neo4j Batch {batch_count} processed:")
-                        # print(f"  Relationships in batch: {len(batch)}")
-                        # print(f"  Batch processing time: {batch_duration:.2f} seconds")
-                        print(f"  Progress: {relationships_processed}/{total_relationships} ({(relationships_processed/total_relationships*100):.1f}%)")
-                        print("----------------------------------------")
-                        
-                    except Exception as e:
-                        logging.error(f"Neo4j batch error: {str(e)}")
-                        # If APOC is not available, fall back to basic MERGE
-                        fallback_query = """
-                        UNWIND $batch as row
-                        MERGE (from:Sequence {id: row.from_id})
-                        MERGE (to:Sequence {id: row.to_id})
-                        CALL {
-                            WITH from, to, row
-                            MERGE (from)-[r:`${row.relationship}`]->(to)
-                        }
-                        """
-                        try:
-                            session.run(fallback_query, {"batch": batch})
-                        except Exception as e2:
-                            logging.error(f"Neo4j fallback error: {str(e2)}")
-                    
-                    batch = []
-
-    async def process_sequences(self, start: int, end: int, num_workers: int = 10):
-        """Main processing function"""
+                if written:
+                    self.relationships_written += len(batch)
+                    self.metrics.counter("relationships_written", "Relationships committed to Neo4j").inc(len(batch))
+                    self.metrics.counter("sequences_written", "Sequences whose relationships are committed").inc(
+                        len(batch_sequences))
+                else:
+                    self.failed_sequences.extend(batch_sequences)
+                    self.metrics.counter("db_batches_failed", "Relationship batches that could not be written").inc()
+                    batch_sequences = []
+                batch = []
+            
+            # Only sequences whose relationships are committed count as done
+            if batch_sequences and not batch:
+                if self.checkpoint:
+                    self.checkpoint.mark(batch_sequences)
+                batch_sequences = []
+            
+            if item is None:
+                break
+
+    async def queue_sequences(self, start: int, end: int, num_workers: int, resume: bool = False):
+        """Feed the bounded sequence queue, then tell every scraper to stop"""
+        for i in range(start, end + 1):
+            sequence_number = f"A{i:06d}"
+            if resume and self.checkpoint.is_done(sequence_number):
+                self.skipped_count += 1
+                continue
+            await self.sequence_queue.put(sequence_number)
+        for _ in range(num_workers):
+            await self.sequence_queue.put(None)
+
+    async def process_sequences(self, start: int, end: int, num_workers: int = 32, resume: bool = False,
+                                fresh: bool = False):
+        """Main processing function: scraping and Neo4j writes run concurrently.
+        num_workers is the upper bound; the limiter adapts the actual concurrency below it.
+        With resume=True, sequences recorded in the checkpoint are skipped; with fresh=True the
+        checkpoint is set aside and started over. A non-empty checkpoint needs one of the two."""
+        if resume and not self.checkpoint:
+            raise ValueError("resume=True needs a checkpoint")
+        if resume and fresh:
+            raise ValueError("resume=True and fresh=True exclude each other")
+        if self.checkpoint and not resume:
+            if self.checkpoint.completed and not fresh:
+                raise ValueError(f"{self.checkpoint.path} already records {len(self.checkpoint.completed)} sequences; "
+                                 f"resume=True continues that run, fresh=True starts over")
+            backup = self.checkpoint.reset()
+            if backup:
+                print(f"Previous checkpoint kept as {backup}")
+        
         self.init_time = time.time()
-        self.last_batch_time = self.init_time
         self.processed_count = 0
+        self.skipped_count = 0
+        self.relationships_written = 0
+        self.neo4j_time = 0.0
         self.sequences_processed.clear()
+        self.failed_sequences = []
+        self.limiter = AdaptiveLimiter(initial=min(4, num_workers), max_limit=num_workers)
+        self.sequence_queue = asyncio.Queue(maxsize=num_workers * 2)
+        self.results_queue = asyncio.Queue(maxsize=self.results_queue_size)
+        self.metrics.gauge("sequence_queue_depth", "Sequences waiting for a scraper",
+                           lambda: self.sequence_queue.qsize())
+        self.metrics.gauge("results_queue_depth", "Scraped sequences waiting for the Neo4j writer",
+                           lambda: self.results_queue.qsize())
+        self.metrics.gauge("fetch_concurrency", "Current adaptive limit on concurrent requests",
+                           lambda: int(self.limiter.limit))
+        # A sequence is done once its relationships are committed (or it was skipped or failed)
+        written = self.metrics.counter("sequences_written", "Sequences whose relationships are committed")
+        self.metrics.track_progress(end - start + 1,
+                                    lambda: written.value + self.skipped_count + len(self.failed_sequences),
+                                    "sequences")
+        self.metrics.start()
         
         print(f"Starting processing of sequences A{start:06d} to A{end:06d}")
-        print(f"Using {num_workers} workers")
+        print(f"Using up to {num_workers} concurrent requests")
         print("----------------------------------------")
-        
-        # Queue up all sequences
-        for i in range(start, end + 1):
-            sequence_number = f"A{i:06d}"
-            await self.sequence_queue.put(sequence_number)
 
+        if self.parse_workers:
+            self.parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        if self.neo4j_writers > 1:
+            self.neo4j_writer = ParallelWriter(self.driver, self.neo4j_writers)
+
+        try:
+            await self.run_pipeline(start, end, num_workers, resume)
+        finally:
+            if self.checkpoint:
+                self.checkpoint.flush()
+            if self.parse_executor:
+                self.parse_executor.shutdown()
+                self.parse_executor = None
+            if self.neo4j_writer:
+                self.neo4j_writer.close()
+                self.neo4j_writer = None
+            self.metrics.stop()
+
+    async def scrape(self, session, start: int, end: int, num_workers: int, resume: bool):
+        """Feed and run the scrapers, then tell the writer that no more results are coming"""
         # Create worker tasks
-        async with aiohttp.ClientSession() as session:
-            workers = [
-                asyncio.create_task(self.scraper_worker(session))
-                for _ in range(num_workers)
-            ]
-            
-            await self.sequence_queue.join()
-            
+        workers = [
+            asyncio.create_task(self.scraper_worker(session))
+            for _ in range(num_workers)
+        ]
+        try:
+            await self.queue_sequences(start, end, num_workers, resume)
+            await asyncio.gather(*workers)
+        finally:
             for worker in workers:
                 worker.cancel()
-            
-            neo4j_start_time = time.time()
-            self.neo4j_worker()
-            neo4j_duration = time.time() - neo4j_start_time
+        
+        # Flush whatever is left and stop the writer
+        await self.results_queue.put(None)
+
+    async def run_pipeline(self, start: int, end: int, num_workers: int, resume: bool):
+        """Run the scrapers and the Neo4j writer until every sequence is written"""
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+            writer = asyncio.create_task(self.neo4j_worker())
+            scraper = asyncio.create_task(self.scrape(session, start, end, num_workers, resume))
+            # Wait on both: if the writer dies nothing drains the bounded results queue,
+            # and the scrapers would block in put() forever
+            try:
+                done, pending = await asyncio.wait([writer, scraper], return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in (writer, scraper):
+                    task.cancel()
+            await asyncio.gather(writer, scraper, return_exceptions=True)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
             
             total_duration = time.time() - self.init_time
             print("\nFinal Statistics:")
             print(f"Total sequences processed: {self.processed_count}")
-            print(f"Neo4j processing time: {neo4j_duration:.2f} seconds")
+            if resume:
+                print(f"Skipped (already in checkpoint): {self.skipped_count}")
+            print(f"Total relationships written: {self.relationships_written}")
+            print(f"Neo4j processing time: {self.neo4j_time:.2f} seconds")
             print(f"Total processing time: {total_duration:.2f} seconds")
-            print(f"Average time per sequence: {total_duration/self.processed_count:.2f} seconds")
+            print(f"Average time per sequence: {total_duration/max(self.processed_count, 1):.2f} seconds")
+            print(f"Scraper rate: {self.limiter.stats()}")
+            if self.failed_sequences:
+                print(f"Failed sequences ({len(self.failed_sequences)}): {', '.join(sorted(self.failed_sequences))}")
+            if self.cache:
+                print(self.cache.stats())
 
 # Usage example
 async def main():
+    parser = argparse.ArgumentParser(description="Scrape OEIS sequence pages and write their links to Neo4j")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--end", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=32, help="maximum concurrent requests")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count(),
+                        help="processes for HTML parsing (0 = parse in the event loop)")
+    parser.add_argument("--fast-parse", action="store_true", help="use the streaming HTML tokenizer")
+    parser.add_argument("--neo4j-writers", type=int, default=1,
+                        help="concurrent Neo4j write transactions per relationship batch")
+    parser.add_argument("--checkpoint", default="oeis_checkpoint.log",
+                        help="file recording sequences already committed to Neo4j")
+    parser.add_argument("--checkpoint-interval", type=float, default=30.0,
+                        help="seconds between checkpoint flushes")
+    start_mode = parser.add_mutually_exclusive_group()
+    start_mode.add_argument("--resume", action="store_true", help="skip sequences recorded in the checkpoint")
+    start_mode.add_argument("--fresh", action="store_true",
+                            help="start over even if the checkpoint records progress (the old log is renamed)")
+    parser.add_argument("--metrics-file", help="Prometheus text file (or .jsonl) receiving the metrics every interval")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between progress reports")
+    parser.add_argument("--profile", nargs="?", const="profile", metavar="PREFIX",
+                        help="sample the run; writes PREFIX.collapsed (flame graph stacks) and PREFIX.txt (hot spots)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    checkpoint = Checkpoint(args.checkpoint, flush_interval=args.checkpoint_interval)
+    if checkpoint.completed and not (args.resume or args.fresh):
+        checkpoint.close()
+        parser.error(f"{args.checkpoint} records {len(checkpoint.completed)} finished sequences from an earlier run; "
+                     f"pass --resume to continue it or --fresh to start over")
     processor = OEISProcessor(
         neo4j_uri="neo4j://localhost:7687",
         neo4j_user="neo4j",
-        neo4j_password=os.getenv("NEO4J_PASSWORD")
+        neo4j_password=os.getenv("NEO4J_PASSWORD"),
+        cache=ResponseCache(),
+        parse_workers=args.parse_workers,
+        fast_parse=args.fast_parse,
+        checkpoint=checkpoint,
+        neo4j_writers=args.neo4j_writers,
+        metrics=Metrics(args.metrics_file, interval=args.metrics_interval)
     )
-    await processor.process_sequences(1, 1000)
+    try:
+        # Started inside the event loop, so the profiler also times every asyncio task
+        with Profiler(args.profile) if args.profile else nullcontext():
+            await processor.process_sequences(args.start, args.end, args.workers, resume=args.resume,
+                                               fresh=args.fresh)
+    finally:
+        checkpoint.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
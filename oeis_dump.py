@@ -0,0 +1,58 @@
+import io
+import os
+import mmap
+import argparse
+
+from load_oeis_recursive import parse_seq_lines, find_seq_folders
+
+# Every sequence in the internal format starts with its %I line
+RECORD_START = b"\n%I "
+
+
+def iter_dump_chunks(dump_path):
+    """Yield the raw bytes of each sequence in a concatenated internal-format file"""
+    if os.path.getsize(dump_path) == 0:
+        return
+    with open(dump_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < len(data):
+            end = data.find(RECORD_START, start)
+            end = len(data) if end == -1 else end + 1
+            yield data[start:end]
+            start = end
+
+
+def iter_dump_records(dump_path):
+    """Yield one parse_seq_lines dict per sequence (as the loaders' parse_seq_file does for a
+    single .seq file) without reading the whole file into memory"""
+    for chunk in iter_dump_chunks(dump_path):
+        # StringIO with newline=None splits lines exactly like open() in text mode
+        yield parse_seq_lines(io.StringIO(chunk.decode("utf8"), newline=None))
+
+
+def pack_seq_tree(seq_dir, dump_path):
+    """Concatenate every .seq file under seq_dir (A000 ... A376 order) into one dump file"""
+    count = 0
+    with open(dump_path, "wb") as dump:
+        for folder_path in find_seq_folders(seq_dir):
+            for file_name in sorted(os.listdir(folder_path)):
+                if not file_name.endswith(".seq"):
+                    continue
+                with open(os.path.join(folder_path, file_name), "rb") as file:
+                    content = file.read()
+                if not content.strip():
+                    continue
+                dump.write(content if content.endswith(b"\n") else content + b"\n")
+                count += 1
+            print(folder_path)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a seq/ tree into a single internal-format dump file")
+    parser.add_argument("seq_dir", nargs="?", default="seq/")
+    parser.add_argument("dump_path", nargs="?", default="oeis.dump")
+    args = parser.parse_args()
+
+    count = pack_seq_tree(args.seq_dir, args.dump_path)
+    print(f"Packed {count} sequences into {args.dump_path}")
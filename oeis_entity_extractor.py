@@ -1,14 +1,23 @@
-from bs4 import BeautifulSoup
 import requests
+import asyncio
+import argparse
 from neo4j import GraphDatabase
 import re
 import time
 import json
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from typing import Dict, List
 import logging
 from dotenv import load_dotenv
+from oeis_schema import ensure_schema
+from http_cache import ResponseCache, OEIS_BASE_URL
+from rate_control import TokenBudget
+from oeis_sources import HTTPSequenceSource, LocalSeqSource
+from llm_cache import LLMCache
+from llm_metrics import LLMCallLog
+from metrics import Metrics
+from profiling import Profiler
 
 # Load environment variables
 load_dotenv()
@@ -19,100 +28,493 @@ password = os.getenv("NEO4J_PASSWORD")
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class EntityExtractor:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
-        
-    def extract_entities(self, text: str) -> Dict[str, List[str]]:
-        prompt = f"""Please analyze the following text from the OEIS (Online Encyclopedia of Integer Sequences) 
-        and extract relevant entities. Pay special attention to:
-        
-        1. Sequence IDs, which are important. Ignore IDs without any context (e.g., A000045, A001000)
-        2. Mathematical concepts and terms
-        3. Authors and contributors.
-        4. Cross-references to other sequences. You can igonre the 'Sequence in context' part, but consider the 'Cf.' and the 'Adjacent sequences' part. 
-        5. Keywords in the KEYWORDS section.
+# Rough size in tokens, about 4 characters per token. The only estimator: the token budget
+# charges prompts with it and concept_text cuts the LLM input to --text-budget with its inverse
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def estimate_message_tokens(messages: List[Dict]) -> int:
+    return estimate_tokens("".join(message["content"] for message in messages))
+
+# Bump PROMPT_VERSION whenever the prompt or its parameters change in a way the template text does not show;
+# cached results of other versions can then be dropped with --invalidate-llm-cache
+PROMPT_VERSION = "2"
+
+SYSTEM_PROMPT = "You are an expert at analyzing OEIS content and extracting relevant mathematical and technical entities. Respond only with structured JSON."
+
+PROMPT_TEMPLATE = """Please analyze the following text from the OEIS (Online Encyclopedia of Integer Sequences) 
+        and extract the mathematical concepts and terms it uses.
         
         Text to analyze:
         {text}
 
         Please provide only the JSON output with the following structure:
         {{
-            "sequence_ids": [],
-            "mathematical_concepts": [],
-            "authors": [],
-            "cross_references": [],
-            "keywords":[]
+            "mathematical_concepts": []
+        }}"""
+
+# Several entries per request: the answer is keyed by sequence ID so every result can be checked
+ENTRY_HEADER = "=== {sequence_id} ==="
+
+BATCH_PROMPT_TEMPLATE = """Please analyze the following entries from the OEIS (Online Encyclopedia of Integer Sequences) 
+        and extract the mathematical concepts and terms each one uses. Every entry starts with a line
+        "=== <sequence ID> ===".
+        
+        {entries}
+
+        Please provide only the JSON output, with one key per sequence ID:
+        {{
+            "<sequence ID>": {{"mathematical_concepts": []}}
         }}"""
 
+SEQ_ID_PATTERN = re.compile(r"\bA\d{6}\b")
+
+# Lines the OEIS site adds under CROSSREFS; they are not part of the entry's %Y field
+GENERATED_CROSSREF_LINES = ("Sequence in context:", "Adjacent sequences:")
+
+# Trailing submission date of an AUTHOR line, e.g. ", Feb 18 2004"
+AUTHOR_DATE_PATTERN = re.compile(r",?\s*[A-Z][a-z]{2} \d{1,2} \d{4}\.?$")
+AUTHOR_SEPARATOR_PATTERN = re.compile(r",\s*(?:and\s+)?|\s+and\s+")
+
+# Sections sent to the LLM for mathematical concepts, most useful first; everything else
+# (terms, programs, links, site-generated cross-reference lines) is handled by rules or dropped
+CONCEPT_SECTIONS = ["NAME", "COMMENTS", "FORMULA"]
+
+# Default size of the concept text; long entries are cut here instead of paying for every comment line
+DEFAULT_TEXT_BUDGET = 600
+
+# " - David W. Wilson, Aug 30 2007" closing a comment or formula line (or making up the whole line)
+ATTRIBUTION_PATTERN = re.compile(r"(?:^|\s+)-\s+[^-]{2,80}?\s*,\s+[A-Z][a-z]{2} \d{1,2} \d{4}\.?$")
+DOT_LEADER_PATTERN = re.compile(r"\.{4,}")
+
+def extract_structured_entities(sections: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Fill every field except mathematical_concepts straight from the entry's sections"""
+    sequence_id = sections.get("ID", [None])[0]
+    crossref_lines = [line for line in sections.get("CROSSREFS", [])
+                      if not line.startswith(GENERATED_CROSSREF_LINES)]
+
+    sequence_ids = [sequence_id] if sequence_id else []
+    for name, lines in sections.items():
+        if name == "CROSSREFS":
+            lines = crossref_lines
+        for line in lines:
+            sequence_ids.extend(SEQ_ID_PATTERN.findall(line))
+
+    authors = []
+    for line in sections.get("AUTHOR", []):
+        line = AUTHOR_DATE_PATTERN.sub("", line.replace("_", "")).strip().rstrip(".")
+        authors.extend(name.strip() for name in AUTHOR_SEPARATOR_PATTERN.split(line) if name.strip())
+
+    keywords = [keyword.strip() for line in sections.get("KEYWORD", []) for keyword in line.split(",")]
+
+    return {
+        "sequence_ids": list(dict.fromkeys(sequence_ids)),
+        "mathematical_concepts": [],
+        "authors": list(dict.fromkeys(authors)),
+        "cross_references": list(dict.fromkeys(
+            ref for line in crossref_lines for ref in SEQ_ID_PATTERN.findall(line) if ref != sequence_id
+        )),
+        "keywords": list(dict.fromkeys(keyword for keyword in keywords if keyword))
+    }
+
+def concept_text(sections: Dict[str, List[str]], token_budget: int = DEFAULT_TEXT_BUDGET) -> str:
+    """Free text of the entry for the LLM: CONCEPT_SECTIONS lines in order without attributions,
+    cut at a word boundary once token_budget tokens are used (0 = no limit)"""
+    lines = []
+    # In characters: text of at most token_budget * CHARS_PER_TOKEN has estimate_tokens <= token_budget
+    remaining = token_budget * CHARS_PER_TOKEN if token_budget else None
+    for name in CONCEPT_SECTIONS:
+        for line in sections.get(name, []):
+            line = DOT_LEADER_PATTERN.sub("...", ATTRIBUTION_PATTERN.sub("", line)).strip()
+            if not line:
+                continue
+            if remaining is not None and len(line) > remaining:
+                cut = line[:remaining].rsplit(" ", 1)[0]
+                if cut:
+                    lines.append(cut)
+                return "\n".join(lines)
+            lines.append(line)
+            if remaining is not None:
+                remaining -= len(line) + 1
+    return "\n".join(lines)
+
+def valid_entities(entities) -> bool:
+    """An LLM answer for one sequence: a dict whose mathematical_concepts is a list of strings"""
+    concepts = entities.get("mathematical_concepts") if isinstance(entities, dict) else None
+    return isinstance(concepts, list) and all(isinstance(concept, str) for concept in concepts)
+
+def merge_concepts(entities: Dict, result: Dict) -> Dict:
+    """Add the LLM's mathematical_concepts to the rule-based entities"""
+    if isinstance(result, dict) and "error" in result:
+        return result
+    if not valid_entities(result):
+        # e.g. an entry cached before answers were validated
+        return {"error": f"Unexpected extraction result: {str(result)[:200]}"}
+    entities["mathematical_concepts"] = [concept.strip() for concept in result["mathematical_concepts"]
+                                         if concept.strip()]
+    return entities
+
+def parse_result(content: str) -> Dict:
+    """Entities of a single-sequence prompt, or an {"error": ...} result if the answer is malformed"""
+    try:
+        entities = json.loads(content)
+    except (TypeError, ValueError) as e:
+        return {"error": f"Malformed JSON from the API: {str(e)}"}
+    if not valid_entities(entities):
+        return {"error": f"Unexpected answer from the API: {str(content)[:200]}"}
+    return entities
+
+def parse_batch_result(sequence_ids: List[str], content: str):
+    """Per-ID results of a batched prompt, or None if the answer is malformed or misses an ID"""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(result, dict):
+        return None
+    results = {}
+    for sequence_id in sequence_ids:
+        entities = result.get(sequence_id)
+        if not valid_entities(entities):
+            return None
+        results[sequence_id] = entities
+    return results
+
+class EntityExtractor:
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo-0125", base_url: str = None,
+                 max_concurrency: int = 8, tokens_per_minute: int = 0, max_tokens: int = 200,
+                 cache: LLMCache = None, prompt_version: str = PROMPT_VERSION,
+                 text_budget: int = DEFAULT_TEXT_BUDGET, call_log: LLMCallLog = None,
+                 metrics: Metrics = None):
+        # base_url points both clients at another OpenAI-compatible server, e.g. fake_openai_server.py
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.semaphore = asyncio.Semaphore(max_concurrency)  # Requests in flight
+        self.budget = TokenBudget(tokens_per_minute)
+        self.text_budget = text_budget  # Token limit of the concept text per sequence
+        self.call_log = call_log or LLMCallLog()  # Tokens and latency of every request
+        self.metrics = metrics or Metrics()  # Shared with the pipeline stages
+        self.cache = cache  # Parsed results of earlier calls; None always calls the API
+        self.prompt_version = prompt_version
+        self.batch_splits = 0
+
+    def build_messages(self, text: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": PROMPT_TEMPLATE.format(text=text)}
+        ]
+
+    def cache_key(self, text: str) -> str:
+        # Batched and single prompts share entries: both ask for the same concepts at the same version
+        return LLMCache.make_key(self.model, f"{self.prompt_version}\n{SYSTEM_PROMPT}\n{PROMPT_TEMPLATE}", text)
+
+    def cached_result(self, text: str):
+        """(cache key, cached entities or None); the key is None when caching is off"""
+        if not self.cache:
+            return None, None
+        key = self.cache_key(text)
+        return key, self.cache.get(key)
+
+    def store_result(self, key: str, entities: Dict):
+        if key and "error" not in entities:
+            self.cache.put(key, self.model, self.prompt_version, entities)
+
+    def store_text_result(self, text: str, entities: Dict):
+        if self.cache:
+            self.store_result(self.cache_key(text), entities)
+
+    def request_body(self, messages: List[Dict], max_tokens: int) -> Dict:
+        """Chat completion parameters, shared by the live calls and the offline batch file"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.1,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+
+    def record_call(self, sequence_ids: List[str], start: float, response=None, error: Exception = None):
+        usage = response.usage if response is not None else None
+        latency = time.monotonic() - start
+        self.metrics.histogram("llm_call_seconds", "One completion request").observe(latency)
+        self.metrics.counter("llm_calls", "Completion requests sent").inc()
+        if error is not None:
+            self.metrics.counter("llm_calls_failed", "Completion requests that failed").inc()
+        if usage:
+            self.metrics.counter("llm_tokens", "Prompt and completion tokens used").inc(usage.total_tokens)
+        self.call_log.record(
+            sequence_ids,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            latency=latency,
+            status="ok" if error is None else "error",
+            finish_reason=response.choices[0].finish_reason if response is not None else None,
+            model=self.model
+        )
+
+    def extract_entities(self, text: str, sequence_ids: List[str] = None) -> Dict[str, List[str]]:
+        key, entities = self.cached_result(text)
+        if entities is not None:
+            return entities
+        start = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo-0125",
-                messages=[
-                    {"role": "system", "content": "You are an expert at analyzing OEIS content and extracting relevant mathematical and technical entities. Respond only with structured JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=500,
-                response_format={"type": "json_object"}
-            )
+            try:
+                response = self.client.chat.completions.create(
+                    **self.request_body(self.build_messages(text), self.max_tokens)
+                )
+            except Exception as e:
+                self.record_call(sequence_ids or [], start, error=e)
+                raise
+            self.record_call(sequence_ids or [], start, response)
             
-            result = response.choices[0].message.content
-            return json.loads(result)
+            entities = parse_result(response.choices[0].message.content)
+            if "error" in entities:
+                logging.error(entities["error"])
+            self.store_result(key, entities)
+            return entities
                 
         except Exception as e:
             logging.error(f"API call failed: {str(e)}")
             return {"error": f"API call failed: {str(e)}"}
 
+    def extract_from_sections(self, sections: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Rule-based fields plus LLM concepts for the free text only"""
+        entities = extract_structured_entities(sections)
+        text = concept_text(sections, self.text_budget)
+        if not text:
+            return entities
+        return merge_concepts(entities, self.extract_entities(text, sections.get("ID", [])[:1]))
+
+    async def extract_from_sections_async(self, sections: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        entities = extract_structured_entities(sections)
+        text = concept_text(sections, self.text_budget)
+        if not text:
+            return entities
+        return merge_concepts(entities, await self.extract_entities_async(text, sections.get("ID", [])[:1]))
+
+    async def extract_from_sections_batch_async(self, items: List[tuple]) -> List[tuple]:
+        """extract_from_sections_async for several (sequence_id, sections) pairs with one prompt"""
+        entities = {sequence_id: extract_structured_entities(sections) for sequence_id, sections in items}
+        texts = {sequence_id: concept_text(sections, self.text_budget) for sequence_id, sections in items}
+        results = await self.extract_batch_async({sequence_id: text for sequence_id, text in texts.items() if text})
+        return [(sequence_id, merge_concepts(entities[sequence_id], results[sequence_id])
+                 if sequence_id in results else entities[sequence_id])
+                for sequence_id, _ in items]
+
+    async def complete_async(self, messages: List[Dict], max_tokens: int, sequence_ids: List[str]) -> str:
+        """One chat completion under the semaphore and the token budget; raises on API errors"""
+        reserved = estimate_message_tokens(messages) + max_tokens
+        await self.budget.acquire(reserved)
+        start = time.monotonic()
+        try:
+            async with self.semaphore:
+                start = time.monotonic()  # Latency of the request itself, not the wait for a slot
+                response = await self.async_client.chat.completions.create(
+                    **self.request_body(messages, max_tokens)
+                )
+        except Exception as e:
+            self.budget.settle(reserved, 0)
+            self.record_call(sequence_ids, start, error=e)
+            raise
+
+        self.record_call(sequence_ids, start, response)
+        self.budget.settle(reserved, response.usage.total_tokens if response.usage else reserved)
+        return response.choices[0].message.content
+
+    async def extract_entities_async(self, text: str, sequence_ids: List[str] = None) -> Dict[str, List[str]]:
+        """extract_entities for the async pipeline, bounded by the semaphore and the token budget"""
+        key, entities = self.cached_result(text)
+        if entities is not None:
+            return entities
+        return await self.extract_uncached_async(key, text, sequence_ids or [])
+
+    async def extract_uncached_async(self, key: str, text: str, sequence_ids: List[str]) -> Dict[str, List[str]]:
+        try:
+            content = await self.complete_async(self.build_messages(text), self.max_tokens, sequence_ids)
+        except Exception as e:
+            logging.error(f"API call failed: {str(e)}")
+            return {"error": f"API call failed: {str(e)}"}
+        entities = parse_result(content)
+        if "error" in entities:
+            logging.error(entities["error"])
+        # store_result skips error results, so a malformed answer is asked again next time
+        self.store_result(key, entities)
+        return entities
+
+    async def extract_batch_async(self, texts: Dict[str, str]) -> Dict[str, Dict]:
+        """Concepts for several texts keyed by sequence ID; cached texts are not sent again"""
+        results = {}
+        pending = {}
+        for sequence_id, text in texts.items():
+            key, entities = self.cached_result(text)
+            if entities is not None:
+                results[sequence_id] = entities
+            else:
+                pending[sequence_id] = (key, text)
+        if pending:
+            results.update(await self.extract_pending_batch_async(pending))
+        return results
+
+    async def extract_pending_batch_async(self, pending: Dict[str, tuple]) -> Dict[str, Dict]:
+        """Send one batched prompt; when the answer is malformed or misses an ID,
+        split the batch in halves and retry each, down to single-sequence prompts"""
+        if len(pending) == 1:
+            sequence_id, (key, text) = next(iter(pending.items()))
+            return {sequence_id: await self.extract_uncached_async(key, text, [sequence_id])}
+
+        sequence_ids = list(pending)
+        messages = self.build_batch_messages({sequence_id: text for sequence_id, (key, text) in pending.items()})
+        try:
+            content = await self.complete_async(messages, self.max_tokens * len(pending), sequence_ids)
+        except Exception as e:
+            logging.error(f"API call failed: {str(e)}")
+            return {sequence_id: {"error": f"API call failed: {str(e)}"} for sequence_id in sequence_ids}
+
+        results = parse_batch_result(sequence_ids, content)
+        if results is None:
+            self.batch_splits += 1
+            logging.warning(f"Malformed batch answer for {len(sequence_ids)} sequences, splitting")
+            half = len(sequence_ids) // 2
+            first, second = await asyncio.gather(
+                self.extract_pending_batch_async({sequence_id: pending[sequence_id] for sequence_id in sequence_ids[:half]}),
+                self.extract_pending_batch_async({sequence_id: pending[sequence_id] for sequence_id in sequence_ids[half:]})
+            )
+            return {**first, **second}
+        for sequence_id, entities in results.items():
+            self.store_result(pending[sequence_id][0], entities)
+        return results
+
+    def build_batch_messages(self, texts: Dict[str, str]) -> List[Dict]:
+        entries = "\n\n".join(f"{ENTRY_HEADER.format(sequence_id=sequence_id)}\n{text}"
+                               for sequence_id, text in texts.items())
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": BATCH_PROMPT_TEMPLATE.format(entries=entries)}
+        ]
+
 class OEISGraphBuilder:
-    def __init__(self, uri: str, username: str, password: str, api_key: str):
+    # One query per category over every buffered sequence: {sequence_id, items} rows
+    SEQUENCE_QUERY = """
+    UNWIND $rows AS row
+    MERGE (s:Sequence {id: row.sequence_id})
+    SET s.url = row.url
+    """
+
+    CATEGORY_QUERY = """
+    UNWIND $rows AS row
+    MATCH (s:Sequence {{id: row.sequence_id}})
+    UNWIND row.items AS item
+    MERGE (n:{node_label} {{name: item}})
+    MERGE (s)-[r:{relationship}]->(n)
+    """
+
+    REFERENCES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (s1:Sequence {id: row.sequence_id})
+    UNWIND row.items AS ref
+    MERGE (s2:Sequence {id: ref})
+    MERGE (s1)-[r:REFERENCES]->(s2)
+    """
+
+    CATEGORIES = {
+        'mathematical_concepts': ('MathematicalConcept', 'USES_CONCEPT'),
+        'authors': ('Author', 'AUTHORED_BY'),
+        'keywords': ('Keyword', 'HAS_KEYWORD')
+    }
+
+    def __init__(self, uri: str, username: str, password: str, api_key: str,
+                 extractor: EntityExtractor = None, source=None):
         self.driver = GraphDatabase.driver(uri, auth=(username, password))
-        self.extractor = EntityExtractor(api_key)
+        self.extractor = extractor or EntityExtractor(api_key)
+        # Where sequence entries are read from, see oeis_sources
+        self.source = source or HTTPSequenceSource()
+        ensure_schema(self.driver)
 
     def close(self):
         self.driver.close()
 
     def create_nodes_and_relationships(self, sequence_id: str, entities: Dict):
+        self.create_batch([(sequence_id, entities)])
+
+    def create_batch(self, items: List[tuple]):
+        """Write several (sequence_id, entities) pairs in one transaction"""
         with self.driver.session() as session:
-            session.execute_write(self._create_graph_data, sequence_id, entities)
-
-    def _create_graph_data(self, tx, sequence_id: str, entities: Dict):
-        # Create sequence node
-        query_sequence = """
-        MERGE (s:Sequence {id: $sequence_id})
-        SET s.url = $url
-        """
-        url = f"https://oeis.org/{sequence_id}"
-        tx.run(query_sequence, sequence_id=sequence_id, url=url)
-
-        # Create nodes and relationships for each category
-        categories = {
-            'mathematical_concepts': ('MathematicalConcept', 'USES_CONCEPT'),
-            'authors': ('Author', 'AUTHORED_BY'),
-            'keywords': ('Keyword', 'HAS_KEYWORD')
-        }
+            session.execute_write(self._create_graph_batch, items)
+
+    def _create_graph_batch(self, tx, items: List[tuple]):
+        # Create sequence nodes
+        tx.run(self.SEQUENCE_QUERY, rows=[
+            {"sequence_id": sequence_id, "url": f"https://oeis.org/{sequence_id}"} for sequence_id, _ in items
+        ]).consume()
+
+        # Create nodes and relationships for each category, then the cross-references
+        queries = [(category, self.CATEGORY_QUERY.format(node_label=node_label, relationship=relationship))
+                   for category, (node_label, relationship) in self.CATEGORIES.items()]
+        queries.append(('cross_references', self.REFERENCES_QUERY))
+        for category, query in queries:
+            rows = [{"sequence_id": sequence_id, "items": entities[category]}
+                    for sequence_id, entities in items if entities.get(category)]
+            if rows:
+                tx.run(query, rows=rows).consume()
+
+class BufferedGraphWriter:
+    """Collects extraction results and writes them with OEISGraphBuilder.create_batch, one
+    transaction per flush. A flush is due once max_rows sequences are buffered or the
+    oldest of them has waited max_delay seconds, so a slow trickle still reaches Neo4j."""
+
+    def __init__(self, graph_builder: OEISGraphBuilder, max_rows: int = 200, max_delay: float = 5.0):
+        self.graph_builder = graph_builder
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.rows = []
+        self.first_added = None
+        self.written = 0
+        self.flushes = 0
+        self.failed_sequences = []
+
+    def add(self, sequence_id: str, entities: Dict) -> bool:
+        """Buffer one result; returns True when a flush is due"""
+        if not self.rows:
+            self.first_added = time.monotonic()
+        self.rows.append((sequence_id, entities))
+        return self.due()
+
+    def time_left(self):
+        """Seconds until the buffer is due by age, None when it is empty"""
+        if not self.rows:
+            return None
+        return max(0.0, self.max_delay - (time.monotonic() - self.first_added))
+
+    def due(self) -> bool:
+        return len(self.rows) >= self.max_rows or self.time_left() == 0.0
 
-        for category, (node_label, relationship) in categories.items():
-            if category in entities and entities[category]:
-                query = f"""
-                MATCH (s:Sequence {{id: $sequence_id}})
-                UNWIND $items as item
-                MERGE (n:{node_label} {{name: item}})
-                MERGE (s)-[r:{relationship}]->(n)
-                """
-                tx.run(query, sequence_id=sequence_id, items=entities[category])
-
-        # Handle cross-references
-        if 'cross_references' in entities and entities['cross_references']:
-            query_refs = """
-            MATCH (s1:Sequence {id: $sequence_id})
-            UNWIND $refs as ref
-            MERGE (s2:Sequence {id: ref})
-            MERGE (s1)-[r:REFERENCES]->(s2)
-            """
-            tx.run(query_refs, sequence_id=sequence_id, refs=entities['cross_references'])
-
-def process_sequences(start: int, end: int):
+    def flush(self) -> int:
+        """Write the buffer; failures are logged and kept in failed_sequences. Returns sequences written."""
+        rows, self.rows = self.rows, []
+        if not rows:
+            return 0
+        try:
+            self.graph_builder.create_batch(rows)
+        except Exception as e:
+            logging.error(f"Neo4j batch error: {str(e)}")
+            self.failed_sequences.extend(sequence_id for sequence_id, _ in rows)
+            return 0
+        self.written += len(rows)
+        self.flushes += 1
+        logging.info(f"Wrote {len(rows)} sequences ({self.written} total)")
+        return len(rows)
+
+    def stats(self) -> str:
+        return (f"Neo4j writes: {self.written} sequences in {self.flushes} transactions, "
+                f"{len(self.failed_sequences)} failed")
+
+def process_sequences(start: int, end: int, cache: ResponseCache = None, base_url: str = OEIS_BASE_URL,
+                      llm_cache: LLMCache = None, text_budget: int = DEFAULT_TEXT_BUDGET, call_log: LLMCallLog = None,
+                      source=None, write_batch_size: int = 200, write_interval: float = 5.0):
     # Neo4j connection details
     URI = "neo4j://localhost:7687"
     USERNAME = "neo4j"
@@ -124,7 +526,10 @@ def process_sequences(start: int, end: int):
         raise ValueError("Please set your OPENAI_API_KEY environment variable")
 
     # Initialize graph builder
-    graph_builder = OEISGraphBuilder(URI, USERNAME, PASSWORD, api_key)
+    extractor = EntityExtractor(api_key, cache=llm_cache, text_budget=text_budget, call_log=call_log)
+    source = source or HTTPSequenceSource(cache=cache, base_url=base_url)
+    graph_builder = OEISGraphBuilder(URI, USERNAME, PASSWORD, api_key, extractor=extractor, source=source)
+    writer = BufferedGraphWriter(graph_builder, max_rows=write_batch_size, max_delay=write_interval)
 
     try:
         init_time = time.time()
@@ -135,27 +540,24 @@ def process_sequences(start: int, end: int):
 
             try:
                 # Fetch sequence data
-                url = f"https://oeis.org/{sequence_number}"
-                response = requests.get(url)
-                response.raise_for_status()  # Raise exception for bad status codes
-                
-                soup = BeautifulSoup(response.content, "html.parser")
-                sequence = soup.find(class_='sequence')
+                sections = source.get_sync(sequence_number)
+                if sections is None:
+                    logging.error(f"Sequence {sequence_number} not found")
+                    continue
                 
-                if sequence:
-                    web_text = sequence.get_text(strip=True)
+                if sections:
                     # Extract entities
-                    entities = graph_builder.extractor.extract_entities(web_text)
+                    entities = graph_builder.extractor.extract_from_sections(sections)
                     
                     if "error" not in entities:
-                        # Create graph data
-                        graph_builder.create_nodes_and_relationships(sequence_number, entities)
+                        # Create graph data with the next flush
+                        writer.add(sequence_number, entities)
                         logging.info(f"Successfully processed {sequence_number}")
                     else:
                         logging.error(f"Entity extraction failed for {sequence_number}: {entities['error']}")
                 
-                # Add a small delay to avoid overwhelming the server
-                time.sleep(1)
+                if writer.due():
+                    writer.flush()
                 
             except requests.exceptions.RequestException as e:
                 logging.error(f"Failed to fetch {sequence_number}: {str(e)}")
@@ -164,9 +566,361 @@ def process_sequences(start: int, end: int):
                 logging.error(f"Error processing {sequence_number}: {str(e)}")
                 continue
 
+        writer.flush()
         total_time = time.time() - init_time
         logging.info(f"Total processing time: {total_time:.2f} seconds")
+        logging.info(extractor.call_log.summary())
+        logging.info(writer.stats())
+        for line in source.stats():
+            logging.info(line)
+        if llm_cache:
+            logging.info(llm_cache.stats())
+
+    finally:
+        source.close()
+        graph_builder.close()
+
+# Rule-based entities and LLM input of an offline job, written next to its requests file
+ENTITIES_SUFFIX = ".entities.jsonl"
+
+class BatchJobWriter:
+    """Offline mode: a JSONL file of chat completion requests for the batch API, several
+    sequences per request, plus a sidecar with each sequence's rule-based entities"""
+
+    def __init__(self, extractor: EntityExtractor, requests_path: str, sequences_per_request: int = 20):
+        self.extractor = extractor
+        self.sequences_per_request = sequences_per_request
+        self.requests_file = open(requests_path, "w", encoding="utf-8")
+        self.entities_file = open(requests_path + ENTITIES_SUFFIX, "w", encoding="utf-8")
+        self.texts = {}
+        self.request_count = 0
+        self.sequence_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, sequence_id: str, sections: Dict[str, List[str]]):
+        entities = extract_structured_entities(sections)
+        text = concept_text(sections, self.extractor.text_budget)
+        if text:
+            key, cached = self.extractor.cached_result(text)
+            if cached is not None:
+                entities = merge_concepts(entities, cached)
+                text = None
+        self.add_entities(sequence_id, entities, text or None)
+
+    def add_entities(self, sequence_id: str, entities: Dict, text: str = None):
+        """text None means the entities are complete and need no request"""
+        self.write_entities(sequence_id, entities, text)
+        if text:
+            self.texts[sequence_id] = text
+            if len(self.texts) >= self.sequences_per_request:
+                self.flush()
+
+    def add_group(self, group: Dict[str, tuple]):
+        """One request for exactly these {sequence_id: (entities, text)}, used to split a failed request"""
+        for sequence_id, (entities, text) in group.items():
+            self.write_entities(sequence_id, entities, text)
+        self.add_request({sequence_id: text for sequence_id, (entities, text) in group.items()})
+
+    def write_entities(self, sequence_id: str, entities: Dict, text: str = None):
+        self.entities_file.write(json.dumps({"sequence_id": sequence_id, "entities": entities, "text": text}) + "\n")
+        self.sequence_count += 1
+
+    def add_request(self, texts: Dict[str, str]):
+        messages = self.extractor.build_batch_messages(texts)
+        self.requests_file.write(json.dumps({
+            "custom_id": ",".join(texts),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self.extractor.request_body(messages, self.extractor.max_tokens * len(texts))
+        }) + "\n")
+        self.request_count += 1
+
+    def flush(self):
+        if self.texts:
+            self.add_request(self.texts)
+            self.texts = {}
+
+    def close(self):
+        self.flush()
+        self.requests_file.close()
+        self.entities_file.close()
+
+def ingest_batch_results(graph_builder: OEISGraphBuilder, requests_path: str, results_path: str,
+                         retry_path: str, write_batch_size: int = 200) -> Dict[str, int]:
+    """Offline mode, second step: merge a finished batch job with the rule-based entities and write them.
+    Requests whose answer failed or is malformed are split in halves into a new job at retry_path."""
+    extractor = graph_builder.extractor
+    pending = {}
+    with open(requests_path + ENTITIES_SUFFIX, encoding="utf-8") as file:
+        for line in file:
+            row = json.loads(line)
+            pending[row["sequence_id"]] = (row["entities"], row["text"])
+
+    completed = []
+    retry_groups = []
+    answered = set()
+    with open(results_path, encoding="utf-8") as file:
+        for line in file:
+            row = json.loads(line)
+            sequence_ids = [sequence_id for sequence_id in row["custom_id"].split(",") if sequence_id in pending]
+            answered.update(sequence_ids)
+            response = row.get("response") or {}
+            results = None
+            if response.get("status_code") == 200:
+                body = response["body"]
+                usage = body.get("usage") or {}
+                extractor.call_log.record(sequence_ids, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                                          finish_reason=body["choices"][0].get("finish_reason"),
+                                          model=body.get("model"), source="batch")
+                results = parse_batch_result(sequence_ids, body["choices"][0]["message"]["content"])
+            else:
+                extractor.call_log.record(sequence_ids, status="error", source="batch")
+            if results is None:
+                retry_groups.append(sequence_ids)
+                continue
+            for sequence_id in sequence_ids:
+                entities, text = pending[sequence_id]
+                extractor.store_text_result(text, results[sequence_id])
+                completed.append((sequence_id, merge_concepts(entities, results[sequence_id])))
+
+    # Sequences that needed no request are complete already; requested ones without any answer are retried
+    completed.extend((sequence_id, entities) for sequence_id, (entities, text) in pending.items() if text is None)
+    retry_groups.append([sequence_id for sequence_id, (entities, text) in pending.items()
+                         if text is not None and sequence_id not in answered])
+
+    for i in range(0, len(completed), write_batch_size):
+        graph_builder.create_batch(completed[i:i + write_batch_size])
+
+    with BatchJobWriter(extractor, retry_path) as job:
+        for sequence_ids in retry_groups:
+            half = max(1, len(sequence_ids) // 2)
+            for group in (sequence_ids[:half], sequence_ids[half:]):
+                if group:
+                    job.add_group({sequence_id: pending[sequence_id] for sequence_id in group})
+    return {"written": len(completed), "retried": job.sequence_count, "retry_requests": job.request_count}
 
+class ExtractionPipeline:
+    """Fetch -> LLM extraction -> batched Neo4j writes as concurrent stages.
+    Every stage reads from a bounded queue, so the slowest one (usually the LLM)
+    sets the pace and the others block instead of piling up pages in memory.
+    Writing an offline batch job needs no graph builder, only an extractor and a source."""
+
+    def __init__(self, graph_builder: OEISGraphBuilder = None, fetch_workers: int = 4, llm_workers: int = 8,
+                 write_batch_size: int = 200, queue_size: int = 100, llm_batch_size: int = 1,
+                 write_interval: float = 5.0, extractor: EntityExtractor = None, source=None):
+        self.graph_builder = graph_builder
+        self.extractor = extractor or graph_builder.extractor
+        self.source = source or graph_builder.source
+        self.metrics = self.extractor.metrics
+        self.fetch_workers = fetch_workers
+        self.llm_workers = llm_workers
+        self.write_batch_size = write_batch_size
+        self.write_interval = write_interval  # Longest a finished result waits for its Neo4j flush
+        self.queue_size = queue_size
+        self.llm_batch_size = llm_batch_size  # Sequences packed into one completion request
+        self.processed_count = 0
+        self.failed_sequences = []
+
+    async def fetch_worker(self):
+        while True:
+            sequence_number = await self.sequence_queue.get()
+            if sequence_number is None:
+                break
+            try:
+                with self.metrics.time("fetch_seconds", "Reading one sequence from the source, including parsing"):
+                    sections = await self.source.get(sequence_number)
+                if sections is None:
+                    logging.error(f"Sequence {sequence_number} not found")
+                    self.failed_sequences.append(sequence_number)
+                    continue
+                if sections:
+                    await self.text_queue.put((sequence_number, sections))
+            except Exception as e:
+                logging.error(f"Failed to fetch {sequence_number}: {str(e)}")
+                self.failed_sequences.append(sequence_number)
+
+    async def llm_worker(self):
+        done = False
+        while not done:
+            # Take whatever is queued, up to llm_batch_size pages, without waiting for a full batch
+            items = []
+            item = await self.text_queue.get()
+            while item is not None:
+                items.append(item)
+                if len(items) >= self.llm_batch_size or self.text_queue.empty():
+                    break
+                item = self.text_queue.get_nowait()
+            done = item is None
+            if not items:
+                continue
+
+            try:
+                with self.metrics.time("extract_seconds", "Extracting one batch of sequences, cache hits included"):
+                    if len(items) == 1:
+                        sequence_number, sections = items[0]
+                        results = [(sequence_number, await self.extractor.extract_from_sections_async(sections))]
+                    else:
+                        results = await self.extractor.extract_from_sections_batch_async(items)
+            except Exception as e:
+                # One bad page must not take the worker down with it
+                logging.error(f"Entity extraction failed for {', '.join(number for number, _ in items)}: {str(e)}")
+                self.failed_sequences.extend(number for number, _ in items)
+                continue
+            for sequence_number, entities in results:
+                if "error" in entities:
+                    logging.error(f"Entity extraction failed for {sequence_number}: {entities['error']}")
+                    self.failed_sequences.append(sequence_number)
+                    continue
+                await self.results_queue.put((sequence_number, entities))
+
+    async def request_writer(self, requests_path: str, sequences_per_request: int):
+        """Offline mode: turn fetched pages into a batch job instead of calling the API"""
+        with BatchJobWriter(self.extractor, requests_path, sequences_per_request) as job:
+            while True:
+                item = await self.text_queue.get()
+                if item is None:
+                    break
+                job.add(*item)
+        logging.info(f"Wrote {job.request_count} requests for {job.sequence_count} sequences to {requests_path}")
+
+    async def write_worker(self):
+        writer = BufferedGraphWriter(self.graph_builder, max_rows=self.write_batch_size, max_delay=self.write_interval)
+        try:
+            while True:
+                try:
+                    # Wake up when the oldest buffered result is due, even if nothing new arrives
+                    item = await asyncio.wait_for(self.results_queue.get(), timeout=writer.time_left())
+                except asyncio.TimeoutError:
+                    item = ()
+                if item:
+                    writer.add(*item)
+                if item is None or writer.due():
+                    with self.metrics.time("db_batch_seconds", "Committing one batch of sequences"):
+                        self.processed_count += await asyncio.to_thread(writer.flush)
+                if item is None:
+                    break
+        finally:
+            # Cancelled because another stage failed: still write what was already extracted
+            self.processed_count += writer.flush()
+            self.failed_sequences.extend(writer.failed_sequences)
+            logging.info(writer.stats())
+
+    async def feed(self, start: int, end: int, fetch_tasks: List, llm_tasks: List, writer):
+        """Queue the range, then shut the stages down in order, each one after the stage feeding it has drained"""
+        for i in range(start, end + 1):
+            await self.sequence_queue.put(f"A{i:06d}")
+        for _ in fetch_tasks:
+            await self.sequence_queue.put(None)
+        await asyncio.gather(*fetch_tasks)
+        for _ in llm_tasks:
+            await self.text_queue.put(None)
+        await asyncio.gather(*llm_tasks)
+        if writer:
+            await self.results_queue.put(None)
+            await writer
+
+    async def run(self, start: int, end: int, requests_path: str = None, sequences_per_request: int = 20):
+        """With requests_path, write an offline batch job (see ingest_batch_results) instead of calling the LLM"""
+        if not requests_path and self.graph_builder is None:
+            raise ValueError("Writing to Neo4j needs a graph builder")
+        self.sequence_queue = asyncio.Queue(maxsize=self.fetch_workers * 2)
+        self.text_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.results_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.metrics.gauge("sequence_queue_depth", "Sequences waiting to be read", lambda: self.sequence_queue.qsize())
+        self.metrics.gauge("text_queue_depth", "Sequences waiting for extraction", lambda: self.text_queue.qsize())
+        self.metrics.gauge("results_queue_depth", "Extracted sequences waiting for Neo4j",
+                           lambda: self.results_queue.qsize())
+        self.metrics.track_progress(end - start + 1, lambda: self.processed_count + len(self.failed_sequences),
+                                    "sequences")
+        self.metrics.start()
+        init_time = time.time()
+
+        await self.source.start()
+        try:
+            if requests_path:
+                writer = None
+                llm_tasks = [asyncio.create_task(self.request_writer(requests_path, sequences_per_request))]
+            else:
+                writer = asyncio.create_task(self.write_worker())
+                llm_tasks = [asyncio.create_task(self.llm_worker()) for _ in range(self.llm_workers)]
+            fetch_tasks = [asyncio.create_task(self.fetch_worker()) for _ in range(self.fetch_workers)]
+            tasks = fetch_tasks + llm_tasks + ([writer] if writer else [])
+            tasks.append(asyncio.create_task(self.feed(start, end, fetch_tasks, llm_tasks, writer)))
+            # Wait on every stage: if one dies, the stages feeding it would block on its full queue forever
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            await self.source.stop()
+            self.metrics.stop()
+
+        total_time = time.time() - init_time
+        logging.info(f"Processed {self.processed_count} sequences in {total_time:.2f} seconds "
+                     f"({self.processed_count / max(total_time, 1e-9):.2f} sequences/s)")
+        for line in self.source.stats():
+            logging.info(line)
+        logging.info(self.extractor.call_log.summary())
+        logging.info(f"{self.extractor.budget.waited:.1f}s waiting for the token budget, "
+                     f"{self.extractor.batch_splits} malformed batches split")
+        if self.failed_sequences:
+            logging.info(f"Failed sequences ({len(self.failed_sequences)}): {', '.join(sorted(self.failed_sequences))}")
+        if self.extractor.cache:
+            logging.info(self.extractor.cache.stats())
+
+async def process_sequences_async(start: int, end: int, cache: ResponseCache = None, base_url: str = OEIS_BASE_URL,
+                                  llm_base_url: str = None, model: str = "gpt-3.5-turbo-0125",
+                                  fetch_workers: int = 4, llm_concurrency: int = 8, tokens_per_minute: int = 0,
+                                  write_batch_size: int = 200, llm_cache: LLMCache = None, llm_batch_size: int = 1,
+                                  requests_path: str = None, sequences_per_request: int = 20,
+                                  text_budget: int = DEFAULT_TEXT_BUDGET, call_log: LLMCallLog = None,
+                                  source=None, write_interval: float = 5.0, metrics: Metrics = None):
+    """Concurrent version of process_sequences, see ExtractionPipeline"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        if not requests_path:
+            raise ValueError("Please set your OPENAI_API_KEY environment variable")
+        api_key = "offline"  # Writing a batch job makes no API calls
+
+    extractor = EntityExtractor(api_key, model=model, base_url=llm_base_url,
+                                max_concurrency=llm_concurrency, tokens_per_minute=tokens_per_minute,
+                                cache=llm_cache, text_budget=text_budget, call_log=call_log, metrics=metrics)
+    source = source or HTTPSequenceSource(cache=cache, base_url=base_url, workers=fetch_workers)
+    # Preparing an offline job only reads sequences; Neo4j is needed when its results are ingested
+    graph_builder = None
+    if not requests_path:
+        graph_builder = OEISGraphBuilder("neo4j://localhost:7687", "neo4j", os.getenv("NEO4J_PASSWORD"),
+                                         api_key, extractor=extractor, source=source)
+    try:
+        pipeline = ExtractionPipeline(graph_builder, fetch_workers=fetch_workers, llm_workers=llm_concurrency,
+                                      write_batch_size=write_batch_size, llm_batch_size=llm_batch_size,
+                                      write_interval=write_interval, extractor=extractor, source=source)
+        await pipeline.run(start, end, requests_path=requests_path, sequences_per_request=sequences_per_request)
+    finally:
+        if graph_builder:
+            graph_builder.close()
+
+def ingest_offline_results(requests_path: str, results_path: str, retry_path: str,
+                           llm_cache: LLMCache = None, write_batch_size: int = 200, call_log: LLMCallLog = None):
+    """Offline mode, second step, with the default Neo4j connection"""
+    api_key = os.getenv("OPENAI_API_KEY") or "offline"  # Ingesting makes no API calls
+    graph_builder = OEISGraphBuilder("neo4j://localhost:7687", "neo4j", os.getenv("NEO4J_PASSWORD"),
+                                     api_key, extractor=EntityExtractor(api_key, cache=llm_cache, call_log=call_log))
+    try:
+        counts = ingest_batch_results(graph_builder, requests_path, results_path, retry_path, write_batch_size)
+        logging.info(f"Wrote {counts['written']} sequences; {counts['retried']} sequences in "
+                     f"{counts['retry_requests']} requests left for {retry_path}")
+        logging.info(graph_builder.extractor.call_log.summary())
     finally:
         graph_builder.close()
 
@@ -177,4 +931,81 @@ if __name__ == "__main__":
     '''
     # process_sequences(1, 3)  # Process sequences A000001 to A000003
     # process_sequences(3, 50)
-    process_sequences(50, 100)
+    parser = argparse.ArgumentParser(description="Extract entities from OEIS pages with an LLM and write them to Neo4j")
+    parser.add_argument("--start", type=int, default=50)
+    parser.add_argument("--end", type=int, default=100)
+    parser.add_argument("--serial", action="store_true", help="use the original one-sequence-at-a-time loop")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="maximum concurrent page requests")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="maximum concurrent completion requests")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="LLM token budget (0 = unlimited)")
+    parser.add_argument("--llm-base-url", default=os.getenv("OPENAI_BASE_URL"),
+                        help="OpenAI-compatible endpoint, e.g. http://127.0.0.1:8080/v1 for fake_openai_server.py")
+    parser.add_argument("--model", default="gpt-3.5-turbo-0125")
+    parser.add_argument("--write-batch-size", type=int, default=200, help="sequences per Neo4j transaction")
+    parser.add_argument("--write-interval", type=float, default=5.0,
+                        help="seconds a finished sequence may wait before its batch is written")
+    parser.add_argument("--llm-cache", default="llm_cache.db", help="SQLite cache of extraction results")
+    parser.add_argument("--no-llm-cache", action="store_true", help="always call the API")
+    parser.add_argument("--text-budget", type=int, default=DEFAULT_TEXT_BUDGET,
+                        help="tokens of name/comment/formula text sent per sequence (0 = no limit)")
+    parser.add_argument("--llm-metrics", default="llm_calls.jsonl",
+                        help="JSONL file receiving tokens, latency and outcome of every LLM request")
+    parser.add_argument("--llm-batch-size", type=int, default=1, help="sequences packed into one completion request")
+    parser.add_argument("--offline-prepare", metavar="REQUESTS_JSONL",
+                        help="write a batch API job for the range instead of calling the API")
+    parser.add_argument("--offline-ingest", metavar="RESULTS_JSONL",
+                        help="write the results of a finished batch job (needs --offline-requests)")
+    parser.add_argument("--offline-requests", metavar="REQUESTS_JSONL", help="requests file the results belong to")
+    parser.add_argument("--offline-retry", metavar="RETRY_JSONL", default="batch_retry.jsonl",
+                        help="new job for requests whose results failed or were malformed")
+    parser.add_argument("--offline-batch-size", type=int, default=20, help="sequences per offline request")
+    parser.add_argument("--invalidate-llm-cache", action="store_true",
+                        help=f"drop cached results of prompt versions other than {PROMPT_VERSION} before starting")
+    parser.add_argument("--source", choices=["http", "local"], default="http",
+                        help="read sequences from oeis.org or from a local seq/ tree (no network)")
+    parser.add_argument("--seq-dir", default="seq/", help="seq/ tree for --source local")
+    parser.add_argument("--metrics-file", help="Prometheus text file (or .jsonl) receiving the metrics every interval")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between progress reports")
+    parser.add_argument("--profile", nargs="?", const="profile", metavar="PREFIX",
+                        help="sample the run; writes PREFIX.collapsed (flame graph stacks) and PREFIX.txt (hot spots)")
+    args = parser.parse_args()
+
+    llm_cache = None if args.no_llm_cache else LLMCache(args.llm_cache)
+    call_log = LLMCallLog(args.llm_metrics)
+    if args.source == "local":
+        source = LocalSeqSource(args.seq_dir, workers=args.fetch_workers)
+    else:
+        source = HTTPSequenceSource(cache=ResponseCache(), workers=args.fetch_workers)
+    if llm_cache and args.invalidate_llm_cache:
+        logging.info(f"Dropped {llm_cache.invalidate(keep_version=PROMPT_VERSION)} cached results")
+    profiler = Profiler(args.profile) if args.profile else None
+    if profiler:
+        profiler.start()
+    try:
+        if args.offline_ingest:
+            if not args.offline_requests:
+                parser.error("--offline-ingest needs --offline-requests")
+            ingest_offline_results(args.offline_requests, args.offline_ingest, args.offline_retry,
+                                   llm_cache=llm_cache, write_batch_size=args.write_batch_size, call_log=call_log)
+        elif args.serial:
+            process_sequences(args.start, args.end, llm_cache=llm_cache,
+                              text_budget=args.text_budget, call_log=call_log, source=source,
+                              write_batch_size=args.write_batch_size, write_interval=args.write_interval)
+        else:
+            pipeline = process_sequences_async(
+                args.start, args.end, llm_base_url=args.llm_base_url, model=args.model,
+                fetch_workers=args.fetch_workers, llm_concurrency=args.llm_concurrency,
+                tokens_per_minute=args.tokens_per_minute, write_batch_size=args.write_batch_size,
+                llm_cache=llm_cache, llm_batch_size=args.llm_batch_size,
+                requests_path=args.offline_prepare, sequences_per_request=args.offline_batch_size,
+                text_budget=args.text_budget, call_log=call_log, source=source,
+                write_interval=args.write_interval,
+                metrics=Metrics(args.metrics_file, interval=args.metrics_interval)
+            )
+            asyncio.run(profiler.watch(pipeline) if profiler else pipeline)
+    finally:
+        if profiler:
+            profiler.stop()
+        call_log.close()
+        if llm_cache:
+            llm_cache.close()
@@ -0,0 +1,127 @@
+from html.parser import HTMLParser
+from typing import List, Dict
+
+from bs4 import BeautifulSoup
+
+
+def parse_sequence_links(sequence_number: str, content: str) -> List[Dict]:
+    """Links found in each section body of an OEIS page, keyed by section name (BeautifulSoup)"""
+    soup = BeautifulSoup(content, "html.parser")
+    sections = soup.find_all("div", class_="section")
+
+    sequence_data = []
+    for section in sections:
+        sectname = section.find("div", class_="sectname").get_text(strip=True)
+        sectbody = section.find("div", class_="sectbody")
+        if sectbody:
+            links = sectbody.find_all("a")
+            for link in links:
+                sequence_data.append({
+                    'from_id': sequence_number,
+                    'to_id': link.get_text(strip=True),
+                    'relationship': sectname
+                })
+    return sequence_data
+
+
+class SectionLinkParser(HTMLParser):
+    """Streaming version of parse_sequence_links: tracks div nesting instead of building a tree"""
+
+    def __init__(self, sequence_number: str):
+        super().__init__(convert_charrefs=True)
+        self.sequence_number = sequence_number
+        self.sequence_data = []
+        self.div_classes = []      # classes of every open div, innermost last
+        self.section_depth = None  # depth of the open div.section
+        self.name_depth = None     # depth of the open div.sectname
+        self.body_depth = None     # depth of the open div.sectbody
+        self.sectname = None
+        self.name_parts = []
+        self.seen_body = False
+        self.links = []            # text parts of each open <a> inside the section body
+        self.section_links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            classes = (dict(attrs).get("class") or "").split()
+            self.div_classes.append(classes)
+            depth = len(self.div_classes)
+            if self.section_depth is None:
+                if "section" in classes:
+                    self.section_depth = depth
+                    self.sectname = None
+                    self.seen_body = False
+                    self.section_links = []
+            elif "sectname" in classes and self.sectname is None and self.name_depth is None:
+                self.name_depth = depth
+                self.name_parts = []
+            elif "sectbody" in classes and not self.seen_body and self.body_depth is None:
+                self.body_depth = depth
+                self.seen_body = True
+        elif tag == "a" and self.body_depth is not None:
+            self.links.append([])
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self.links:
+            self.section_links.append("".join(self.links.pop()))
+        elif tag == "div" and self.div_classes:
+            depth = len(self.div_classes)
+            self.div_classes.pop()
+            if depth == self.name_depth:
+                self.sectname = "".join(self.name_parts)
+                self.name_depth = None
+            elif depth == self.body_depth:
+                self.body_depth = None
+            elif depth == self.section_depth:
+                self.section_depth = None
+                for link_text in self.section_links:
+                    self.sequence_data.append({
+                        'from_id': self.sequence_number,
+                        'to_id': link_text,
+                        'relationship': self.sectname
+                    })
+
+    def handle_data(self, data):
+        # get_text(strip=True) strips every text node and joins them without a separator
+        text = data.strip()
+        if not text:
+            return
+        if self.name_depth is not None:
+            self.name_parts.append(text)
+        for parts in self.links:
+            parts.append(text)
+
+
+def parse_sequence_links_fast(sequence_number: str, content: str) -> List[Dict]:
+    """Same output as parse_sequence_links without building a soup tree"""
+    parser = SectionLinkParser(sequence_number)
+    parser.feed(content)
+    parser.close()
+    return parser.sequence_data
+
+
+def element_text(element) -> str:
+    """Text of an element with all whitespace runs collapsed to single spaces"""
+    return " ".join(element.get_text(" ").split())
+
+
+def parse_sections(content) -> Dict[str, List[str]]:
+    """Lines of every section of an OEIS page keyed by section name (OFFSET, COMMENTS, CROSSREFS, ...),
+    plus ID and NAME from the page header; empty if the page holds no sequence entry"""
+    soup = BeautifulSoup(content, "html.parser")
+    sections = {}
+    seqnum = soup.find("div", class_="seqnum")
+    if seqnum is None:
+        return sections
+    sections["ID"] = [element_text(seqnum)]
+    seqname = soup.find("div", class_="seqname")
+    if seqname:
+        sections["NAME"] = [element_text(seqname)]
+
+    for section in soup.find_all("div", class_="section"):
+        sectname = section.find("div", class_="sectname")
+        sectbody = section.find("div", class_="sectbody")
+        if sectname and sectbody:
+            lines = [element_text(line) for line in sectbody.find_all("div", class_="sectline")]
+            sections[element_text(sectname)] = lines or [element_text(sectbody)]
+    return sections
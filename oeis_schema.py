@@ -0,0 +1,88 @@
+import os
+import logging
+from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
+from dotenv import load_dotenv
+
+# Uniqueness constraints (name -> label, key property); each also backs the MERGE lookups with an index
+CONSTRAINTS = {
+    "sequence_id_unique": ("Sequence", "id"),
+    "author_name_unique": ("Author", "name"),
+    "reference_citation_unique": ("Reference", "citation"),
+    "keyword_name_unique": ("Keyword", "name"),
+    "mathematical_concept_name_unique": ("MathematicalConcept", "name"),
+}
+
+# Plain indexes created by earlier versions of the scripts, by the constraint replacing each.
+# Neo4j will not create a uniqueness constraint while a plain index covers the same property.
+LEGACY_INDEXES = {
+    "sequence_id_unique": "sequence_id",
+    "author_name_unique": "author_name",
+    "reference_citation_unique": "reference_citation",
+}
+
+
+def create_constraint(session, name: str, label: str, key: str):
+    session.run(f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{key} IS UNIQUE").consume()
+
+
+def index_exists(session, index_name: str) -> bool:
+    return session.run("SHOW INDEXES YIELD name WHERE name = $name RETURN count(*) AS found",
+                       name=index_name).single()["found"] > 0
+
+
+def count_duplicates(session, label: str, key: str) -> int:
+    """Number of key values shared by more than one node (scans the label, only used when a constraint fails)"""
+    return session.run(
+        f"MATCH (n:{label}) WHERE n.{key} IS NOT NULL "
+        f"WITH n.{key} AS value, count(*) AS copies WHERE copies > 1 RETURN count(*) AS duplicates"
+    ).single()["duplicates"]
+
+
+def duplicates_error(name: str, label: str, key: str, duplicates: int, cause) -> RuntimeError:
+    if not duplicates:
+        return RuntimeError(f"Cannot create constraint {name} on :{label}({key}): {cause}")
+    return RuntimeError(f"Cannot create constraint {name}: {duplicates} :{label}({key}) values are on more than "
+                        f"one node. Merge or delete the duplicate nodes, then start again ({cause})")
+
+
+def ensure_schema(driver):
+    """Create the uniqueness constraints if they are missing (safe to call on every start).
+    A legacy index is only dropped once its constraint exists, or right before creating it when
+    the index is in the way and the data has no duplicates; if the constraint still cannot be
+    created the index is restored. Raises RuntimeError instead of leaving a label unindexed."""
+    with driver.session() as session:
+        for name, (label, key) in CONSTRAINTS.items():
+            legacy_index = LEGACY_INDEXES.get(name)
+            try:
+                create_constraint(session, name, label, key)
+            except Neo4jError as e:
+                if not legacy_index or not index_exists(session, legacy_index):
+                    raise duplicates_error(name, label, key, count_duplicates(session, label, key), e.message) from e
+                # The old index blocks the constraint; replace it only if the constraint can hold
+                duplicates = count_duplicates(session, label, key)
+                if duplicates:
+                    raise duplicates_error(name, label, key, duplicates, e.message) from e
+                session.run(f"DROP INDEX {legacy_index} IF EXISTS").consume()
+                try:
+                    create_constraint(session, name, label, key)
+                except Neo4jError as retry_error:
+                    session.run(f"CREATE INDEX {legacy_index} IF NOT EXISTS FOR (n:{label}) ON (n.{key})").consume()
+                    raise RuntimeError(f"Cannot create constraint {name} on :{label}({key}), "
+                                       f"kept index {legacy_index}: {retry_error.message}") from retry_error
+                logging.info(f"Replaced index {legacy_index} with constraint {name}")
+                continue
+            if legacy_index:
+                session.run(f"DROP INDEX {legacy_index} IF EXISTS").consume()
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    load_dotenv()
+
+    driver = GraphDatabase.driver("neo4j://localhost:7687", auth=("neo4j", os.getenv("NEO4J_PASSWORD")))
+    try:
+        ensure_schema(driver)
+        print("Schema ready: " + ", ".join(f":{label}({key})" for label, key in CONSTRAINTS.values()))
+    finally:
+        driver.close()
@@ -0,0 +1,150 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import aiohttp
+import requests
+
+from http_cache import ResponseCache, fetch_page, fetch_page_sync, OEIS_BASE_URL
+from rate_control import AdaptiveLimiter
+from oeis_html import parse_sections
+
+# Where a sequence's entry comes from for entity extraction. Every source returns the
+# section dict of oeis_html.parse_sections ({"ID": [...], "NAME": [...], "COMMENTS": [...], ...}),
+# or None when the sequence does not exist, and raises when it could not be read.
+
+# Internal-format line codes and the section names the OEIS pages use for them
+SEQ_SECTIONS = {
+    "%N": "NAME",
+    "%C": "COMMENTS",
+    "%D": "REFERENCES",
+    "%H": "LINKS",
+    "%F": "FORMULA",
+    "%e": "EXAMPLE",
+    "%p": "MAPLE",
+    "%t": "MATHEMATICA",
+    "%o": "PROG",
+    "%Y": "CROSSREFS",
+    "%K": "KEYWORD",
+    "%O": "OFFSET",
+    "%A": "AUTHOR",
+    "%E": "EXTENSIONS",
+}
+
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def parse_seq_sections(lines) -> Dict[str, List[str]]:
+    """Section dict of one sequence in internal format; terms (%S/%T/%U) are left out"""
+    sections = {}
+    for line in lines:
+        parts = line.rstrip("\n").split(" ", 2)
+        if len(parts) < 2:
+            continue
+        if parts[0] == "%I":
+            sections["ID"] = [parts[1]]
+        elif parts[0] in SEQ_SECTIONS:
+            text = HTML_TAG_PATTERN.sub("", parts[2]).strip() if len(parts) > 2 else ""
+            if text:
+                sections.setdefault(SEQ_SECTIONS[parts[0]], []).append(text)
+    return sections
+
+
+class HTTPSequenceSource:
+    """Sequence pages from oeis.org (or OEIS_BASE_URL) through the response cache"""
+
+    def __init__(self, cache: ResponseCache = None, base_url: str = OEIS_BASE_URL, workers: int = 4):
+        self.cache = cache
+        self.base_url = base_url
+        self.workers = workers
+        self.session = None
+        self.limiter = None
+        self.http = None
+
+    async def start(self):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        self.limiter = AdaptiveLimiter(initial=min(4, self.workers), max_limit=self.workers)
+
+    async def stop(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def sections_from(self, sequence_number: str, response) -> Optional[Dict[str, List[str]]]:
+        if response.status == 404:
+            return None
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        return parse_sections(response.body)
+
+    async def get(self, sequence_number: str) -> Optional[Dict[str, List[str]]]:
+        url = f"{self.base_url}/{sequence_number}"
+        response = await self.limiter.call(lambda: fetch_page(self.session, url, self.cache))
+        if response.status != 200:
+            return self.sections_from(sequence_number, response)
+        # Parsing a full page takes long enough to stall the other fetches
+        return await asyncio.to_thread(parse_sections, response.body)
+
+    def get_sync(self, sequence_number: str) -> Optional[Dict[str, List[str]]]:
+        if self.http is None:
+            self.http = requests.Session()
+        response = fetch_page_sync(self.http, f"{self.base_url}/{sequence_number}", self.cache)
+        # Add a small delay to avoid overwhelming the server
+        if not response.from_cache:
+            time.sleep(1)
+        return self.sections_from(sequence_number, response)
+
+    def close(self):
+        if self.http:
+            self.http.close()
+            self.http = None
+
+    def stats(self) -> List[str]:
+        lines = []
+        if self.limiter:
+            lines.append(f"Fetch rate: {self.limiter.stats()}")
+        if self.cache:
+            lines.append(self.cache.stats())
+        return lines
+
+
+class LocalSeqSource:
+    """Sequences from a local seq/ tree (seq/A000/A000001.seq), no network involved"""
+
+    def __init__(self, seq_dir: str = "seq/", workers: int = 4):
+        self.seq_dir = seq_dir
+        self.workers = workers
+        self.read_count = 0
+        self.missing_count = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def seq_path(self, sequence_number: str) -> str:
+        return os.path.join(self.seq_dir, sequence_number[:4], f"{sequence_number}.seq")
+
+    async def get(self, sequence_number: str) -> Optional[Dict[str, List[str]]]:
+        return await asyncio.to_thread(self.get_sync, sequence_number)
+
+    def get_sync(self, sequence_number: str) -> Optional[Dict[str, List[str]]]:
+        try:
+            with open(self.seq_path(sequence_number), "r", encoding="utf8") as file:
+                sections = parse_seq_sections(file)
+        except FileNotFoundError:
+            self.missing_count += 1
+            logging.debug(f"No local file for {sequence_number}")
+            return None
+        self.read_count += 1
+        return sections
+
+    def close(self):
+        pass
+
+    def stats(self) -> List[str]:
+        return [f"Local files read: {self.read_count}, missing: {self.missing_count}"]
@@ -0,0 +1,282 @@
+import io
+import os
+import time
+import argparse
+from array import array
+
+import numpy as np
+
+from load_oeis_recursive import find_seq_folders
+from oeis_dump import iter_dump_chunks
+
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+# Placeholder stored in `values` for terms that live in the overflow table
+OVERFLOW = INT64_MIN
+# Multiplier used to fold consecutive term hashes into one n-gram key
+GRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+# Read the %S/%T/%U lines of one sequence; continued lines end with a comma
+def parse_terms(lines):
+    seq_id = None
+    parts = []
+    for line in lines:
+        if line.startswith(('%S', '%T', '%U')):
+            fields = line.split(None, 2)
+            if len(fields) == 3:
+                parts.append(fields[2].strip())
+        elif line.startswith('%I'):
+            seq_id = line.split()[1].strip()
+    return seq_id, [int(term) for term in "".join(parts).split(",") if term.strip()]
+
+
+def fits_int64(term: int) -> bool:
+    # OVERFLOW itself is reserved, so INT64_MIN goes to the overflow table too
+    return INT64_MIN < term <= INT64_MAX
+
+
+def term_hash(term: int) -> int:
+    """Value used for n-gram keys: the term itself when it fits in int64, else its Python hash"""
+    return term if fits_int64(term) else hash(term)
+
+
+def gram_keys(hashes: np.ndarray, n: int) -> np.ndarray:
+    """Keys for every window of n consecutive term hashes (uint64 arithmetic wraps around)"""
+    count = len(hashes) - n + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    keys = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for k in range(n):
+            keys = keys * GRAM_MULTIPLIER + hashes[k:k + count]
+    return keys
+
+
+def contains_run(terms, query) -> bool:
+    m = len(query)
+    return any(terms[i:i + m] == query for i in range(len(terms) - m + 1))
+
+
+class TermStore:
+    """All sequences' terms in one int64 array, with big integers kept in an overflow side table"""
+
+    def __init__(self, ids, offsets: np.ndarray, values: np.ndarray, overflow: dict):
+        self.ids = ids
+        self.offsets = offsets
+        self.values = values
+        self.overflow = overflow
+        self._hashes = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, records):
+        """Build from an iterable of (seq_id, terms) pairs"""
+        ids = []
+        offsets = array('q', [0])
+        values = array('q')
+        overflow = {}
+        for seq_id, terms in records:
+            if not seq_id:
+                continue
+            for term in terms:
+                if fits_int64(term):
+                    values.append(term)
+                else:
+                    overflow[len(values)] = term
+                    values.append(OVERFLOW)
+            ids.append(seq_id)
+            offsets.append(len(values))
+        return cls(ids, np.frombuffer(offsets, dtype=np.int64), np.frombuffer(values, dtype=np.int64), overflow)
+
+    def terms(self, ordinal: int):
+        start, end = int(self.offsets[ordinal]), int(self.offsets[ordinal + 1])
+        terms = self.values[start:end].tolist()
+        if self.overflow:
+            for i, term in enumerate(terms):
+                if term == OVERFLOW:
+                    terms[i] = self.overflow[start + i]
+        return terms
+
+    def hashes(self) -> np.ndarray:
+        """term_hash of every stored term, as uint64"""
+        if self._hashes is None:
+            hashes = self.values.copy()
+            for position, term in self.overflow.items():
+                hashes[position] = hash(term)
+            self._hashes = hashes.view(np.uint64)
+        return self._hashes
+
+    def ordinals(self, positions: np.ndarray) -> np.ndarray:
+        """Sequence ordinal owning each position in `values`"""
+        return np.searchsorted(self.offsets, positions, side="right") - 1
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, "terms.npz"), offsets=self.offsets, values=self.values)
+        with open(os.path.join(path, "ids.txt"), "w") as file:
+            file.write("\n".join(self.ids))
+        with open(os.path.join(path, "overflow.txt"), "w") as file:
+            for position, term in sorted(self.overflow.items()):
+                file.write(f"{position} {term}\n")
+
+    @classmethod
+    def load(cls, path: str):
+        arrays = np.load(os.path.join(path, "terms.npz"))
+        with open(os.path.join(path, "ids.txt")) as file:
+            ids = file.read().split()
+        overflow = {}
+        with open(os.path.join(path, "overflow.txt")) as file:
+            for line in file:
+                position, term = line.split()
+                overflow[int(position)] = int(term)
+        return cls(ids, arrays["offsets"], arrays["values"], overflow)
+
+
+class NgramIndex:
+    """Inverted index from n consecutive terms to the sequences containing them, stored as sorted arrays"""
+
+    def __init__(self, n: int, keys: np.ndarray, starts: np.ndarray, postings: np.ndarray):
+        self.n = n
+        self.keys = keys
+        self.starts = starts
+        self.postings = postings
+
+    @classmethod
+    def build(cls, store: TermStore, n: int = 3):
+        keys = gram_keys(store.hashes(), n)
+        positions = np.arange(len(keys))
+        ordinals = store.ordinals(positions)
+        # Drop windows that run across the end of a sequence
+        valid = positions + n <= store.offsets[ordinals + 1]
+        keys, ordinals = keys[valid], ordinals[valid]
+
+        order = np.lexsort((ordinals, keys))
+        keys, ordinals = keys[order], ordinals[order]
+        unique = np.ones(len(keys), dtype=bool)
+        unique[1:] = (keys[1:] != keys[:-1]) | (ordinals[1:] != ordinals[:-1])
+        keys, ordinals = keys[unique], ordinals[unique]
+
+        index_keys, starts = np.unique(keys, return_index=True)
+        starts = np.append(starts, len(keys)).astype(np.int64)
+        return cls(n, index_keys, starts, ordinals.astype(np.uint32))
+
+    def posting(self, key) -> np.ndarray:
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return np.zeros(0, dtype=np.uint32)
+        return self.postings[self.starts[i]:self.starts[i + 1]]
+
+    def candidates(self, query) -> np.ndarray:
+        """Ordinals of sequences holding every n-gram of the query (query must have >= n terms)"""
+        hashes = np.array([term_hash(term) for term in query], dtype=np.int64).view(np.uint64)
+        lists = sorted((self.posting(key) for key in np.unique(gram_keys(hashes, self.n))), key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, "ngram_index.npz"),
+                 n=self.n, keys=self.keys, starts=self.starts, postings=self.postings)
+
+    @classmethod
+    def load(cls, path: str):
+        arrays = np.load(os.path.join(path, "ngram_index.npz"))
+        return cls(int(arrays["n"]), arrays["keys"], arrays["starts"], arrays["postings"])
+
+
+class TermSearch:
+    """Answer "which sequences contain these consecutive terms" from a TermStore and NgramIndex"""
+
+    def __init__(self, store: TermStore, index: NgramIndex):
+        self.store = store
+        self.index = index
+
+    def scan_candidates(self, query) -> np.ndarray:
+        # Queries shorter than the n-gram size fall back to a vectorized scan of all terms
+        hashes = np.array([term_hash(term) for term in query], dtype=np.int64).view(np.uint64)
+        all_hashes = self.store.hashes()
+        count = len(all_hashes) - len(query) + 1
+        if count <= 0:
+            return np.zeros(0, dtype=np.int64)
+        mask = np.ones(count, dtype=bool)
+        for k, value in enumerate(hashes):
+            mask &= all_hashes[k:k + count] == value
+        return np.unique(self.store.ordinals(np.nonzero(mask)[0]))
+
+    def search(self, query, limit=None):
+        query = [int(term) for term in query]
+        if not query:
+            return []
+        if len(query) >= self.index.n:
+            candidates = self.index.candidates(query)
+        else:
+            candidates = self.scan_candidates(query)
+
+        # Hash collisions and windows across sequence ends are ruled out on the real terms
+        matches = []
+        for ordinal in candidates:
+            if contains_run(self.store.terms(int(ordinal)), query):
+                matches.append(self.store.ids[ordinal])
+                if limit and len(matches) >= limit:
+                    break
+        return matches
+
+    def save(self, path: str):
+        self.store.save(path)
+        self.index.save(path)
+
+    @classmethod
+    def load(cls, path: str):
+        return cls(TermStore.load(path), NgramIndex.load(path))
+
+
+def iter_seq_tree_terms(seq_dir):
+    for folder_path in find_seq_folders(seq_dir):
+        for file_name in sorted(os.listdir(folder_path)):
+            if file_name.endswith(".seq"):
+                with open(os.path.join(folder_path, file_name), 'r', encoding='utf8') as file:
+                    yield parse_terms(file)
+        print(folder_path)
+
+
+def iter_dump_terms(dump_path):
+    for chunk in iter_dump_chunks(dump_path):
+        yield parse_terms(io.StringIO(chunk.decode("utf8"), newline=None))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the OEIS term store and n-gram index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="parse %S/%T/%U lines and build the index")
+    build_parser.add_argument("index_dir")
+    build_parser.add_argument("--seq-dir", default="seq/")
+    build_parser.add_argument("--dump", help="read a single concatenated dump file instead of the seq/ tree")
+    build_parser.add_argument("-n", type=int, default=3, help="consecutive terms per index key")
+
+    search_parser = subparsers.add_parser("search", help="find sequences containing consecutive terms")
+    search_parser.add_argument("index_dir")
+    search_parser.add_argument("terms", help="comma-separated terms, e.g. 1,2,5,14,42")
+    search_parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        records = iter_dump_terms(args.dump) if args.dump else iter_seq_tree_terms(args.seq_dir)
+        store = TermStore.build(records)
+        search = TermSearch(store, NgramIndex.build(store, args.n))
+        search.save(args.index_dir)
+        print(f"Indexed {len(store)} sequences, {len(store.values)} terms "
+              f"({len(store.overflow)} beyond int64), {len(search.index.keys)} distinct {args.n}-grams")
+    else:
+        search = TermSearch.load(args.index_dir)
+        start_time = time.time()
+        matches = search.search(args.terms.split(","), args.limit)
+        print(f"{len(matches)} matches in {(time.time() - start_time) * 1000:.1f} ms")
+        print(", ".join(matches))
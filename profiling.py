@@ -0,0 +1,220 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter, abc
+from typing import Dict, List
+
+# Stage of a sample: the outermost frame matching one of these rules, checked in order.
+# Outermost, so a socket read inside the Neo4j driver counts as neo4j rather than network.
+STAGE_RULES = [
+    ("neo4j", ("neo4j", "parallel_writer", "oeis_schema", "benchmarks.fake_neo4j"), ()),
+    ("llm", ("openai",), ()),
+    ("network", ("aiohttp", "requests", "urllib3", "http.client", "ssl", "socket", "http_cache"), ()),
+    ("html", ("bs4", "soupsieve", "html.parser", "oeis_html"), ()),
+    ("parse", ("oeis_dump",), ("parse_seq_file", "parse_seq_lines", "parse_seq_sections", "parse_folder",
+                               "parse_batch_result")),
+]
+# A thread whose innermost frame is in one of these modules is waiting for work
+IDLE_MODULES = ("selectors", "threading", "queue", "concurrent.futures.thread", "multiprocessing.connection")
+
+
+def module_matches(module: str, prefixes) -> bool:
+    return any(module == prefix or module.startswith(prefix + ".") for prefix in prefixes)
+
+
+class TaskStats:
+    def __init__(self):
+        self.tasks = 0
+        self.steps = 0
+        self.busy = 0.0
+        self.max_step = 0.0
+
+
+class TimedCoroutine(abc.Coroutine):
+    """Wraps the coroutine of a task and adds the time each of its steps holds the event loop to `stats`"""
+
+    def __init__(self, coro, stats: TaskStats):
+        self.coro = coro
+        self.stats = stats
+        stats.tasks += 1
+
+    def step(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stats.steps += 1
+            self.stats.busy += elapsed
+            self.stats.max_step = max(self.stats.max_step, elapsed)
+
+    def send(self, value):
+        return self.step(self.coro.send, value)
+
+    def throw(self, *args):
+        return self.step(self.coro.throw, *args)
+
+    def close(self):
+        return self.coro.close()
+
+    def __await__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def __getattr__(self, name):
+        # cr_frame, cr_code etc., for Task.get_stack() and repr()
+        return getattr(self.coro, name)
+
+
+class Profiler:
+    """Sampling profiler for the loaders and scrapers.
+    A background thread records the Python stack of every thread each `interval` seconds and
+    attributes it to a stage (neo4j, llm, network, html, parse, idle or other, see STAGE_RULES).
+    On stop it writes `<prefix>.collapsed`, one `stage;thread;frame;...;frame count` line per
+    distinct stack (input for flamegraph.pl or speedscope), and `<prefix>.txt` with the time per
+    stage, the top functions and, if an event loop was watched, the busy time per asyncio task."""
+
+    def __init__(self, prefix: str = "profile", interval: float = 0.005, top: int = 25):
+        self.prefix = prefix
+        self.interval = interval
+        self.top = top
+        self.stacks = Counter()
+        self.samples = 0
+        self.labels = {}
+        self.task_stats: Dict[str, TaskStats] = {}
+        self.thread = None
+        self.stopped = threading.Event()
+        self.start_time = None
+        self.duration = 0.0
+
+    def label(self, frame) -> tuple:
+        code = frame.f_code
+        label = self.labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", "?")
+            # co_qualname is new in Python 3.11; 3.10 only has the bare function name
+            qualname = getattr(code, "co_qualname", code.co_name)
+            label = self.labels[code] = (module, code.co_name, f"{module}:{qualname}")
+        return label
+
+    def stage(self, labels: List[tuple]) -> str:
+        # labels run from the outermost frame to the innermost
+        for module, function, _ in labels:
+            for stage, modules, functions in STAGE_RULES:
+                if function in functions or module_matches(module, modules):
+                    return stage
+        if labels and module_matches(labels[-1][0], IDLE_MODULES):
+            return "idle"
+        return "other"
+
+    def sample(self):
+        names = {thread.ident: thread.name.rstrip("0123456789").rstrip("_-") or thread.name
+                 for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self.label(frame))
+                frame = frame.f_back
+            labels.reverse()
+            stack = (self.stage(labels), names.get(ident, "thread")) + tuple(label[2] for label in labels)
+            self.stacks[stack] += 1
+        self.samples += 1
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def watch_tasks(self, loop=None):
+        """Time the steps of every task created from now on in `loop` (default: the running loop)"""
+        loop = loop or asyncio.get_running_loop()
+
+        def task_factory(loop, coro, **kwargs):
+            name = getattr(coro, "__qualname__", type(coro).__name__)
+            stats = self.task_stats.get(name)
+            if stats is None:
+                stats = self.task_stats[name] = TaskStats()
+            return asyncio.Task(TimedCoroutine(coro, stats), loop=loop, **kwargs)
+
+        loop.set_task_factory(task_factory)
+
+    async def watch(self, coro):
+        """Await coro with the tasks it creates timed, for a pipeline started with asyncio.run()"""
+        self.watch_tasks()
+        return await coro
+
+    def start(self):
+        try:
+            self.watch_tasks()
+        except RuntimeError:
+            pass  # no running event loop; use watch() to get the task breakdown
+        self.start_time = time.perf_counter()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        self.duration = time.perf_counter() - self.start_time
+        self.write()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def report(self) -> str:
+        stages = Counter()
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            stages[stack[0]] += count
+            if stack[0] == "idle":
+                continue
+            own[stack[-1]] += count
+            for frame in set(stack[2:]):
+                total[frame] += count
+        thread_samples = sum(stages.values()) or 1
+        busy = thread_samples - stages["idle"] or 1
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms over {self.duration:.1f}s, "
+                 f"{thread_samples} thread stacks ({stages['idle']} idle)", "",
+                 f"{'stage':<10} {'samples':>9} {'% busy':>8} {'% all':>8}"]
+        for stage, count in stages.most_common():
+            share = f"{count / busy * 100:.1f}" if stage != "idle" else "-"
+            lines.append(f"{stage:<10} {count:>9} {share:>8} {count / thread_samples * 100:>8.1f}")
+        lines += ["", f"Top {self.top} functions by own samples (idle excluded)",
+                  f"{'own %':>7} {'total %':>8}  function"]
+        for frame, count in own.most_common(self.top):
+            lines.append(f"{count / busy * 100:>7.1f} {total[frame] / busy * 100:>8.1f}  {frame}")
+        if self.task_stats:
+            lines += ["", "asyncio tasks by time holding the event loop",
+                      f"{'busy s':>8} {'% wall':>7} {'tasks':>7} {'steps':>9} {'mean ms':>8} {'max ms':>8}  coroutine"]
+            for name, stats in sorted(self.task_stats.items(), key=lambda item: -item[1].busy):
+                share = stats.busy / self.duration * 100 if self.duration else 0.0
+                mean = stats.busy / stats.steps * 1000 if stats.steps else 0.0
+                lines.append(f"{stats.busy:>8.2f} {share:>7.1f} {stats.tasks:>7} {stats.steps:>9} {mean:>8.2f} "
+                             f"{stats.max_step * 1000:>8.1f}  {name}")
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        with open(self.prefix + ".collapsed", "w", encoding="utf-8") as file:
+            file.write(self.collapsed())
+        report = self.report()
+        with open(self.prefix + ".txt", "w", encoding="utf-8") as file:
+            file.write(report)
+        logging.info(f"Profile written to {self.prefix}.collapsed and {self.prefix}.txt\n{report}")
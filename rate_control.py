@@ -0,0 +1,168 @@
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+# Statuses worth retrying; 429 and 503 also mean the server wants us to slow down
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+OVERLOAD_STATUSES = {429, 503}
+
+
+def parse_retry_after(value) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), 0 if absent"""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit: grow by one slot per window of healthy responses, halve on overload"""
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 target_latency: float = 2.0, max_retries: int = 5,
+                 base_delay: float = 0.5, max_delay: float = 60.0):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.pause_until = 0.0
+        self.last_decrease = 0.0
+
+        self.start_time = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.overloads = 0
+
+    async def acquire(self):
+        async with self.condition:
+            while self.in_flight >= int(self.limit):
+                await self.condition.wait()
+            self.in_flight += 1
+        # Honour the latest Retry-After before sending anything
+        delay = self.pause_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self, latency: float):
+        if latency > self.target_latency:
+            self.on_overload()
+        else:
+            # Additive increase: about +1 slot after `limit` healthy responses
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_overload(self, retry_after: float = 0.0):
+        now = time.monotonic()
+        self.overloads += 1
+        if retry_after:
+            self.pause_until = max(self.pause_until, now + retry_after)
+        # Multiplicative decrease, at most once per latency window so a burst of errors halves once
+        if now - self.last_decrease > self.target_latency:
+            self.limit = max(self.min_limit, self.limit / 2)
+            self.last_decrease = now
+
+    def backoff(self, attempt: int, retry_after: float = 0.0) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        return max(retry_after, random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    async def call(self, request):
+        """Run request() under the limit, retrying 429/5xx and connection errors.
+        Returns the last response; raises the last connection error if every attempt failed."""
+        response = None
+        for attempt in range(self.max_retries + 1):
+            error = None
+            retry_after = 0.0
+            await self.acquire()
+            start = time.monotonic()
+            try:
+                response = await request()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            finally:
+                await self.release()
+            self.requests += 1
+
+            if error is None and response.status not in RETRY_STATUSES:
+                self.on_success(time.monotonic() - start)
+                return response
+
+            if error is None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status in OVERLOAD_STATUSES or retry_after:
+                    self.on_overload(retry_after)
+            else:
+                self.on_overload()
+
+            if attempt == self.max_retries:
+                if error is not None:
+                    raise error
+                break
+            self.retries += 1
+            delay = self.backoff(attempt, retry_after)
+            reason = repr(error) if error is not None else f"HTTP {response.status}"
+            logging.warning(f"Retrying in {delay:.1f}s after {reason}")
+            await asyncio.sleep(delay)
+        return response
+
+    def requests_per_second(self) -> float:
+        return self.requests / max(time.monotonic() - self.start_time, 1e-9)
+
+    def stats(self) -> str:
+        return (f"{self.requests_per_second():.1f} req/s, concurrency limit {self.limit:.1f}, "
+                f"retries {self.retries}, overload signals {self.overloads}")
+
+
+class TokenBudget:
+    """Token bucket for an LLM tokens-per-minute quota; tokens_per_minute=0 disables it"""
+
+    def __init__(self, tokens_per_minute: int = 0):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()  # Waiters are served in arrival order
+        self.waited = 0.0
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: int):
+        """Reserve an estimated number of tokens, sleeping until the bucket holds them"""
+        if not self.capacity:
+            return
+        tokens = min(tokens, self.capacity)
+        async with self.lock:
+            self.refill()
+            while self.available < tokens:
+                delay = (tokens - self.available) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self.refill()
+            self.available -= tokens
+
+    def settle(self, reserved: int, used: int):
+        """Correct a reservation once the response reports the tokens actually used"""
+        if self.capacity:
+            self.available = min(self.capacity, self.available + min(reserved, self.capacity) - used)
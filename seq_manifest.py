@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import hashlib
+
+
+class SeqManifest:
+    """SQLite record of each .seq file's size, mtime and content hash, plus the hash last loaded into Neo4j"""
+
+    def __init__(self, path: str = "seq_manifest.db"):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seq_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                loaded_hash TEXT
+            )
+        """)
+        self.staged = []
+        self.changed_count = 0
+        self.unchanged_count = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        with open(file_path, "rb") as file:
+            return hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+
+    def check(self, file_path: str):
+        """Return (changed, content_hash); the file is only read when its size or mtime moved"""
+        stat = os.stat(file_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash, loaded_hash FROM seq_files WHERE path = ?", (file_path,)
+        ).fetchone()
+
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            content_hash, loaded_hash = row[2], row[3]
+        else:
+            content_hash = self.hash_file(file_path)
+            loaded_hash = row[3] if row else None
+            self.conn.execute(
+                """
+                INSERT INTO seq_files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns, content_hash = excluded.content_hash
+                """,
+                (file_path, stat.st_size, stat.st_mtime_ns, content_hash)
+            )
+
+        changed = content_hash != loaded_hash
+        if changed:
+            self.changed_count += 1
+        else:
+            self.unchanged_count += 1
+        return changed, content_hash
+
+    def stage(self, file_path: str, content_hash: str):
+        """Remember a file handed to the loader; it is marked loaded by the next mark_loaded()"""
+        self.staged.append((content_hash, file_path))
+
+    def mark_loaded(self):
+        """Record every staged file as loaded; call only once its sequence is committed to Neo4j"""
+        self.conn.executemany("UPDATE seq_files SET loaded_hash = ? WHERE path = ?", self.staged)
+        self.conn.commit()
+        self.staged = []